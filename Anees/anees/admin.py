@@ -4,6 +4,8 @@ from django.db.models import Count
 from django.utils.html import format_html, urlencode
 from django.urls import reverse
 import nested_admin
+from .progress import refresh_progress
+from .words import invalidate_learned_words
 
 
 # This project uses webpack for building its javascript and css. To install the dependencies for the build process,
@@ -50,6 +52,11 @@ class ChildAdmin(nested_admin.NestedModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).annotate(current_level=Count("levels"))
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        refresh_progress(form.instance.pk)
+        invalidate_learned_words(form.instance.pk)
+
 
 class ReceptiveImagesInline(nested_admin.NestedTabularInline):
     model = models.ReceptiveImage
@@ -123,6 +130,21 @@ class ChildLevelAdmin(nested_admin.NestedModelAdmin):
         "child__user",
     ]
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        refresh_progress(obj.child_id)
+        invalidate_learned_words(obj.child_id)
+
+    # the progress of deleted rows is refreshed by anees.signals
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_learned_words(obj.child_id)
+
+    def delete_queryset(self, request, queryset):
+        child_ids = set(queryset.values_list("child_id", flat=True))
+        super().delete_queryset(request, queryset)
+        invalidate_learned_words(*child_ids)
+
 
 @admin.register(models.Receptive)
 class ReceptiveAdmin(nested_admin.NestedModelAdmin):
@@ -134,6 +156,86 @@ class SocialAdmin(nested_admin.NestedModelAdmin):
     inlines = [SocialConverstionInline]
 
 
+@admin.register(models.LevelProvisioningJob)
+class LevelProvisioningJobAdmin(admin.ModelAdmin):
+    list_display = ["level", "status", "progress", "created_at", "updated_at"]
+    list_filter = ["status"]
+    list_select_related = ["level"]
+    readonly_fields = [
+        "level",
+        "status",
+        "total",
+        "processed",
+        "last_child_id",
+        "error",
+        "created_at",
+        "updated_at",
+    ]
+
+    @admin.display(ordering="processed")
+    def progress(self, job: models.LevelProvisioningJob):
+        return f"{job.processed} / {job.total}"
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(models.LevelPack)
+class LevelPackAdmin(admin.ModelAdmin):
+    list_display = ["level", "content_version", "size", "built_at"]
+    list_select_related = ["level"]
+    readonly_fields = ["level", "content_version", "file", "digest", "size", "built_at"]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(models.PredictionJob)
+class PredictionJobAdmin(admin.ModelAdmin):
+    list_display = ["id", "user", "label", "status", "attempts", "created_at"]
+    list_filter = ["status"]
+    list_select_related = ["user"]
+    readonly_fields = [
+        "user",
+        "label",
+        "file",
+        "digest",
+        "status",
+        "attempts",
+        "status_code",
+        "result",
+        "error",
+        "created_at",
+        "started_at",
+        "finished_at",
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(models.ChunkedUpload)
+class ChunkedUploadAdmin(admin.ModelAdmin):
+    list_display = ["filename", "user", "target", "offset", "size", "status"]
+    list_filter = ["status", "target"]
+    list_select_related = ["user"]
+    readonly_fields = [
+        "user",
+        "target",
+        "filename",
+        "content_type",
+        "size",
+        "offset",
+        "status",
+        "name",
+        "created_at",
+        "updated_at",
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+
 admin.site.register(models.Expressive)
 admin.site.register(models.ReceptiveImage)
 admin.site.register(models.conversionMessage)
@@ -0,0 +1,178 @@
+import io
+import os
+import wave
+
+import numpy as np
+
+WAV_CONTENT_TYPES = ("audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave")
+
+
+# frames decoded at a time, so memory never holds the raw file and its
+# float copy at once
+WAV_BLOCK_FRAMES = 64 * 1024
+
+
+def pcm_to_float(raw, width):
+    """Convert little-endian PCM bytes of ``width`` bytes a sample to float32 in [-1, 1]."""
+    if width == 1:
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    if width == 2:
+        return np.frombuffer(raw, dtype="<i2").astype(np.float32) / 2**15
+    if width == 3:
+        # widen 24-bit samples to 32-bit by adding a zero low byte
+        triplets = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        padded = np.zeros((len(triplets), 4), dtype=np.uint8)
+        padded[:, 1:] = triplets
+        return padded.view("<i4").ravel().astype(np.float32) / 2**31
+    if width == 4:
+        return np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2**31
+    raise wave.Error(f"unsupported sample width {width}")
+
+
+def decode_wav(source, mono=False):
+    """
+    Decode a PCM WAV, bytes or a file, to a float32 ``(frames, channels)``
+    array in [-1, 1], or a single downmixed channel with ``mono``. The file
+    is read in blocks of WAV_BLOCK_FRAMES.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with wave.open(source, "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        if rate <= 0 or channels <= 0:
+            raise wave.Error(f"invalid header: {channels} channels at {rate} Hz")
+        blocks = []
+        while raw := wav.readframes(WAV_BLOCK_FRAMES):
+            samples = pcm_to_float(raw, width).reshape(-1, channels)
+            blocks.append(downmix(samples) if mono else samples)
+    if not blocks:
+        return np.zeros((0,) if mono else (0, channels), dtype=np.float32), rate
+    return np.concatenate(blocks), rate
+
+
+def encode_wav(signal, rate):
+    """Encode a float signal, mono or ``(frames, channels)``, as 16-bit PCM WAV."""
+    pcm = np.clip(signal * 2**15, -(2**15), 2**15 - 1).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1 if pcm.ndim == 1 else pcm.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def downmix(samples):
+    return samples.mean(axis=1)
+
+
+def resample(signal, rate, target_rate):
+    """
+    Band-limited resampling through the FFT: the spectrum is truncated (or
+    zero padded) to the new length, which also acts as the anti-alias filter.
+    """
+    if rate == target_rate or not len(signal):
+        return signal
+    length = max(round(len(signal) * target_rate / rate), 1)
+    spectrum = np.fft.rfft(signal)
+    return (np.fft.irfft(spectrum, length) * (length / len(signal))).astype(np.float32)
+
+
+def frame_rms(signal, frame_length):
+    frames = len(signal) // frame_length
+    if not frames:
+        return np.sqrt(np.mean(np.square(signal), keepdims=True))
+    framed = signal[: frames * frame_length].reshape(frames, frame_length)
+    return np.sqrt(np.mean(np.square(framed), axis=1))
+
+
+def trim_silence(signal, rate, threshold_db=-40, frame_ms=20):
+    """Cut leading and trailing frames quieter than ``threshold_db`` below the peak."""
+    if not len(signal):
+        return signal
+    frame_length = max(rate * frame_ms // 1000, 1)
+    rms = frame_rms(signal, frame_length)
+    loud = np.flatnonzero(rms > rms.max() * 10 ** (threshold_db / 20))
+    if not len(loud):
+        return signal[:0]
+    return signal[loud[0] * frame_length : (loud[-1] + 1) * frame_length]
+
+
+def normalize(signal, peak=0.95):
+    loudest = np.abs(signal).max() if len(signal) else 0
+    return signal * (peak / loudest) if loudest else signal
+
+
+def mel_filterbank(rate, n_fft, n_mels):
+    def to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    def to_hz(mel):
+        return 700 * (10 ** (mel / 2595) - 1)
+
+    edges = to_hz(np.linspace(0, to_mel(rate / 2), n_mels + 2))
+    bins = np.fft.rfftfreq(n_fft, 1 / rate)
+    lower, centre, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (centre - lower)
+    falling = (upper - bins) / (upper - centre)
+    return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def log_mel_spectrogram(signal, rate, n_mels=40, frame_ms=25, hop_ms=10):
+    """``(frames, n_mels)`` log mel energies of 25 ms Hann windowed frames."""
+    frame_length = rate * frame_ms // 1000
+    hop = rate * hop_ms // 1000
+    if len(signal) < frame_length:
+        signal = np.pad(signal, (0, frame_length - len(signal)))
+    frames = np.lib.stride_tricks.sliding_window_view(signal, frame_length)[::hop]
+    power = np.abs(np.fft.rfft(frames * np.hanning(frame_length), axis=1)) ** 2
+    mel = power @ mel_filterbank(rate, frame_length, n_mels).T
+    return np.log(mel + 1e-10).astype(np.float32)
+
+
+def clean_signal(source, target_rate):
+    """
+    Decode a WAV, bytes or a file, to mono ``target_rate`` audio without
+    leading or trailing silence, peak normalized.
+    """
+    signal, rate = decode_wav(source, mono=True)
+    signal = resample(signal, rate, target_rate)
+    return normalize(trim_silence(signal, target_rate))
+
+
+def preprocess_audio(source, target_rate=16000, features=False):
+    """
+    Turn a WAV upload, bytes or a file, into what the model needs: mono,
+    ``target_rate``, without leading or trailing silence, peak normalized.
+    Returns the payload and its content type, a 16-bit WAV or, with
+    ``features``, a float16 log mel spectrogram saved as ``.npy``. Raises
+    ValueError for a recording that is silent throughout.
+    """
+    signal = clean_signal(source, target_rate)
+    if not len(signal):
+        raise ValueError("the recording is silent")
+    if not features:
+        return encode_wav(signal, target_rate), "audio/wav"
+    buffer = io.BytesIO()
+    np.save(buffer, log_mel_spectrogram(signal, target_rate).astype(np.float16))
+    return buffer.getvalue(), "application/x-npy"
+
+
+def prepare_upload(filename, upload, content_type, target_rate, features=False):
+    """
+    Preprocess a WAV upload for the model. Anything else, a WAV that can't be
+    decoded or one with nothing but silence is passed on untouched. Returns
+    ``(filename, upload, content_type)`` ready for the predictor.
+    """
+    if content_type not in WAV_CONTENT_TYPES:
+        return filename, upload, content_type
+    upload.seek(0)
+    try:
+        payload, content_type = preprocess_audio(upload, target_rate, features)
+    except (wave.Error, EOFError, ValueError):
+        upload.seek(0)
+        return filename, upload, content_type
+    suffix = ".npy" if features else ".wav"
+    return os.path.splitext(filename)[0] + suffix, payload, content_type
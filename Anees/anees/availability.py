@@ -0,0 +1,75 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Exists, OuterRef, Value, When
+
+from .models import Expressive, Level, Receptive, Social
+
+GAME_MODELS = {"receptive": Receptive, "expressive": Expressive, "social": Social}
+GAMES_GENERATION_KEY = "anees:games:generation"
+
+# (generation, {level_id: games}) as loaded by this process
+_level_games = (None, {})
+
+
+def _generation():
+    return cache.get_or_set(GAMES_GENERATION_KEY, time.time_ns, timeout=None)
+
+
+def game_availability():
+    """
+    Map every level id to its games bitmask. The map is loaded with one query
+    and kept in process memory until a game or level changes anywhere, which
+    bumps the shared generation.
+    """
+    global _level_games
+    generation = _generation()
+    loaded, games = _level_games
+    if loaded != generation:
+        games = dict(Level.objects.values_list("pk", "games"))
+        _level_games = (generation, games)
+    return games
+
+
+def level_games(level_id):
+    return game_availability().get(level_id, 0)
+
+
+def has_game(level_id, game):
+    return bool(level_games(level_id) & Level.GAME_FLAGS[game])
+
+
+def invalidate_game_availability():
+    def bump():
+        try:
+            cache.incr(GAMES_GENERATION_KEY)
+        except ValueError:
+            cache.set(GAMES_GENERATION_KEY, time.time_ns(), timeout=None)
+
+    # Bumping again on commit stops a concurrent read from keeping the games
+    # as they were before this transaction under the new generation.
+    bump()
+    transaction.on_commit(bump)
+
+
+def games_expression():
+    """The games bitmask of a level, computed from the game tables."""
+    return sum(
+        (
+            Case(
+                When(
+                    Exists(model.objects.filter(level=OuterRef("pk"))),
+                    then=Value(Level.GAME_FLAGS[game]),
+                ),
+                default=Value(0),
+            )
+            for game, model in GAME_MODELS.items()
+        ),
+        Value(0),
+    )
+
+
+def update_level_games(**filters):
+    Level.objects.filter(**filters).update(games=games_expression())
+    invalidate_game_availability()
@@ -0,0 +1,166 @@
+import base64
+import binascii
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .media import is_valid_upload, upload_field
+from .models import ChunkedUpload
+from .storage import SpooledBlob, blob_digest
+
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A chunk or completion the upload can't accept."""
+
+    def __init__(self, message, status_code=400, offset=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+def part_path(upload: ChunkedUpload):
+    return os.path.join(settings.CHUNKED_UPLOAD_ROOT, f"{upload.pk}.part")
+
+
+def start_upload(user, target, filename, content_type, size):
+    upload = ChunkedUpload.objects.create(
+        user=user,
+        target=target,
+        filename=filename,
+        content_type=content_type,
+        size=size,
+    )
+    os.makedirs(settings.CHUNKED_UPLOAD_ROOT, exist_ok=True)
+    open(part_path(upload), "wb").close()
+    return upload
+
+
+def parse_checksum(header):
+    """Parse an ``Upload-Checksum: sha256 <base64 digest>`` header."""
+    algorithm, _, value = header.partition(" ")
+    if algorithm != "sha256":
+        raise UploadError("Only sha256 Checksums Are Supported")
+    try:
+        return base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise UploadError("The Checksum Is Not Valid Base64")
+
+
+def get_upload(upload_id, user):
+    upload = ChunkedUpload.objects.select_for_update().filter(pk=upload_id, user=user)
+    upload = upload.first()
+    if upload is None:
+        raise UploadError("The Upload Does Not Exist", 404)
+    return upload
+
+
+def append_chunk(upload_id, user, offset, stream, length, checksum=None):
+    """
+    Append ``length`` bytes read from ``stream`` at ``offset``. The chunk is
+    copied in small blocks, so memory stays flat whatever the file size. A
+    chunk cut short by the connection is kept up to where it stopped, one
+    failing its checksum is dropped. Returns the upload at its new offset.
+    """
+    if length > settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+        raise UploadError("The Chunk Is Too Large", 413)
+    with transaction.atomic():
+        upload = get_upload(upload_id, user)
+        if upload.status != ChunkedUpload.UPLOADING:
+            raise UploadError("The Upload Is Already Complete", 409, upload.offset)
+        if offset != upload.offset:
+            raise UploadError(
+                "The Offset Does Not Match The Upload", 409, upload.offset
+            )
+        if offset + length > upload.size:
+            raise UploadError("The Chunk Goes Past The End Of The Upload")
+
+        digest = hashlib.sha256()
+        written = 0
+        with open(part_path(upload), "r+b") as part:
+            # drop whatever an interrupted request wrote past the offset
+            part.seek(offset)
+            part.truncate()
+            try:
+                while written < length:
+                    block = stream.read(min(COPY_BUFFER_SIZE, length - written))
+                    if not block:
+                        break
+                    part.write(block)
+                    digest.update(block)
+                    written += len(block)
+            except OSError:
+                pass
+            if checksum is not None and (
+                written != length or digest.digest() != checksum
+            ):
+                part.truncate(offset)
+                raise UploadError("The Checksum Does Not Match The Chunk", 400, offset)
+
+        upload.offset += written
+        upload.save(update_fields=["offset", "updated_at"])
+    return upload
+
+
+def complete_upload(upload_id, user, digest=None):
+    """
+    Store the assembled file of a fully received upload and record its name.
+    The part file is handed to the storage as is, so the filesystem storage
+    moves it in place rather than copying it. With ``digest``, a file not
+    hashing to it is discarded and the upload has to start over, as is one
+    whose content isn't what its target takes, e.g. a picture that is no
+    image.
+    """
+    error = None
+    with transaction.atomic():
+        upload = get_upload(upload_id, user)
+        if upload.status == ChunkedUpload.COMPLETE:
+            return upload
+        if upload.offset != upload.size:
+            raise UploadError("The Upload Is Missing Bytes", 409, upload.offset)
+
+        path = part_path(upload)
+        field = upload_field(upload.target)
+        try:
+            with open(path, "rb") as part:
+                if not is_valid_upload(upload.target, part):
+                    error = "The File Is Not What It Claims To Be"
+                else:
+                    part.seek(0)
+                    name = default_storage.save(
+                        field.generate_filename(None, upload.filename),
+                        SpooledBlob(part),
+                    )
+                    if digest is not None and blob_digest(name) != digest:
+                        default_storage.delete(name)
+                        error = "The Checksum Does Not Match The File"
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+        if error is not None:
+            upload.delete()
+        else:
+            upload.status = ChunkedUpload.COMPLETE
+            upload.name = name
+            upload.save(update_fields=["status", "name", "updated_at"])
+    if error is not None:
+        # raised outside the transaction, so the discarded upload stays deleted
+        raise UploadError(error)
+    return upload
+
+
+def delete_stale_uploads(older_than):
+    """Delete uploads untouched for ``older_than`` along with their part files."""
+    stale = ChunkedUpload.objects.filter(updated_at__lt=timezone.now() - older_than)
+    deleted = 0
+    for upload in stale.iterator():
+        if os.path.exists(part_path(upload)):
+            os.remove(part_path(upload))
+        upload.delete()
+        deleted += 1
+    return deleted
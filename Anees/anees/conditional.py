@@ -0,0 +1,33 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """Build a strong ETag from the values a response is derived from."""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def conditional_response(request, etag, last_modified, build_response):
+    """
+    Answer with 304 Not Modified when the client's copy matches ``etag`` or
+    ``last_modified``, otherwise call ``build_response``. Validators are
+    computed by the caller from version counters and timestamps so nothing
+    has to be serialized to decide.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = build_response()
+        if response.status_code != 200:
+            return response
+    response.headers["ETag"] = etag
+    if timestamp is not None:
+        response.headers["Last-Modified"] = http_date(timestamp)
+    # Responses are per child, so shared caches must not store them and
+    # clients have to revalidate every time.
+    response.headers["Cache-Control"] = "private, no-cache"
+    patch_vary_headers(response, ["Authorization"])
+    return response
@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.functions import Now
+
+from .models import Expressive, Level, Receptive, Social
+from .serializers import ExpressiveSerializer, ReceptiveSerializer, SocialSerializer
+
+CONTENT_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+GAME_MISSING = "missing"
+
+GAMES = {
+    "receptive": (Receptive, ReceptiveSerializer, ["images"]),
+    "expressive": (Expressive, ExpressiveSerializer, []),
+    "social": (Social, SocialSerializer, ["messages"]),
+}
+
+
+def _content_cache_key(game, level: Level):
+    return f"anees:content:{game}:{level.pk}:{level.content_version}"
+
+
+def load_game_content(game, level: Level):
+    model, serializer_class, prefetch = GAMES[game]
+    instance = model.objects.prefetch_related(*prefetch).filter(level=level).first()
+    if instance is None:
+        return None
+    return serializer_class(instance).data
+
+
+def store_game_content(game, level: Level, content):
+    cache.set(
+        _content_cache_key(game, level),
+        GAME_MISSING if content is None else content,
+        CONTENT_CACHE_TIMEOUT,
+    )
+
+
+def get_game_content(game, level: Level):
+    """
+    Return the serialized game of the level, or None when the level has no
+    such game. Entries are keyed by the level's content version, so editing
+    the game never serves a stale payload.
+    """
+    content = cache.get(_content_cache_key(game, level))
+    if content is None:
+        content = load_game_content(game, level)
+        store_game_content(game, level, content)
+    elif content == GAME_MISSING:
+        content = None
+    return content
+
+
+def get_level_content(level: Level):
+    """
+    Return ``{game: content}`` for every game of the level in one cache round
+    trip, loading and storing only the games that were not cached.
+    """
+    keys = {game: _content_cache_key(game, level) for game in GAMES}
+    cached = cache.get_many(keys.values())
+    contents, missing = {}, {}
+    for game, key in keys.items():
+        if key in cached:
+            content = cached[key]
+            contents[game] = None if content == GAME_MISSING else content
+        else:
+            contents[game] = load_game_content(game, level)
+            missing[key] = GAME_MISSING if contents[game] is None else contents[game]
+    if missing:
+        cache.set_many(missing, CONTENT_CACHE_TIMEOUT)
+    return contents
+
+
+def warm_game_content(level: Level):
+    for game in GAMES:
+        store_game_content(game, level, load_game_content(game, level))
+
+
+def bump_content_version(**filters):
+    Level.objects.filter(**filters).update(
+        content_version=F("content_version") + 1, content_updated_at=Now()
+    )
@@ -0,0 +1,76 @@
+from django import forms
+from django.conf import settings
+from django.contrib.admin.widgets import AdminFileWidget
+from django.db import models
+from django.urls import reverse
+
+from .storage import is_stored_upload
+
+
+class ChunkedFileInput(AdminFileWidget):
+    """
+    Admin file input that sends the chosen file through the resumable upload
+    API (anees/static/anees/chunked_upload.js), so the form only submits the
+    name of the stored file instead of the file itself.
+    """
+
+    template_name = "anees/chunked_file_input.html"
+
+    class Media:
+        js = ["anees/chunked_upload.js"]
+
+    def __init__(self, target, attrs=None):
+        super().__init__(attrs)
+        self.target = target
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context["widget"].update(
+            target=self.target,
+            upload_url=reverse("chunked-uploads"),
+            chunk_size=settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+        )
+        return context
+
+    def value_from_datadict(self, data, files, name):
+        uploaded = data.get(f"{name}_uploaded")
+        if uploaded:
+            return uploaded
+        return super().value_from_datadict(data, files, name)
+
+    def value_omitted_from_data(self, data, files, name):
+        return not data.get(f"{name}_uploaded") and super().value_omitted_from_data(
+            data, files, name
+        )
+
+
+class ChunkedFormField(forms.FileField):
+    """File field also taking the name of a file stored by a chunked upload."""
+
+    def __init__(self, *, upload_to, **kwargs):
+        super().__init__(**kwargs)
+        self.upload_to = upload_to
+
+    def to_python(self, data):
+        if isinstance(data, str):
+            if not is_stored_upload(data, self.upload_to):
+                raise forms.ValidationError(
+                    "The uploaded file could not be found.", code="invalid"
+                )
+            return data
+        return super().to_python(data)
+
+
+class ChunkedFileField(models.FileField):
+    """A FileField edited in the admin through resumable chunked uploads."""
+
+    def formfield(self, **kwargs):
+        target = f"{self.model._meta.model_name}.{self.name}"
+        return super().formfield(
+            **{
+                **kwargs,
+                "form_class": ChunkedFormField,
+                "upload_to": self.upload_to,
+                "widget": ChunkedFileInput(target),
+            }
+        )
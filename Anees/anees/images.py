@@ -0,0 +1,140 @@
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import CharField, F, Value
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Coalesce
+from PIL import Image, ImageOps
+
+from .content import bump_content_version
+from .models import Child, Expressive, ReceptiveImage
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+
+# model -> (image field, how to find the levels whose content shows it)
+IMAGE_FIELDS = {
+    ReceptiveImage: ("img", lambda image: {"receptive__images": image.pk}),
+    Expressive: ("img", lambda image: {"pk": image.level_id}),
+    Child: ("picture", None),
+}
+
+
+def variant_name(name, size, extension):
+    root, _ = os.path.splitext(name)
+    return f"{root}.{size}.{extension}"
+
+
+def render_variants(field_file):
+    """
+    Resize an image to every size in ``IMAGE_VARIANT_SIZES`` (never past the
+    original) and encode each one in every format. Returns ``{size: {format:
+    bytes}}``.
+    """
+    with field_file.open("rb") as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image = image.convert("RGB")
+    rendered = {}
+    for size, edge in settings.IMAGE_VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        rendered[size] = {}
+        for extension, image_format in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(
+                buffer,
+                image_format,
+                quality=settings.IMAGE_VARIANT_QUALITY,
+                optimize=True,
+            )
+            rendered[size][extension] = buffer.getvalue()
+    return rendered
+
+
+def store_variants(field_file):
+    """Write the variants next to the original and return their names."""
+    storage = field_file.storage
+    variants = {"source": field_file.name}
+    for size, encoded in render_variants(field_file).items():
+        variants[size] = {}
+        for extension, data in encoded.items():
+            name = variant_name(field_file.name, size, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            variants[size][extension] = storage.save(name, ContentFile(data))
+    return variants
+
+
+def delete_variants(storage, variants):
+    for size, names in variants.items():
+        if size != "source":
+            for name in names.values():
+                storage.delete(name)
+
+
+def generate_image_variants(model, pk):
+    """
+    Build the variants of one row's image and record them, unless the image
+    was replaced in the meantime. Variants of the previous image are removed.
+    """
+    field, content_filters = IMAGE_FIELDS[model]
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return None
+    field_file = getattr(instance, field)
+    old_variants = getattr(instance, f"{field}_variants")
+    variants = store_variants(field_file) if field_file else {}
+    updated = model.objects.filter(pk=pk, **{field: field_file.name}).update(
+        **{f"{field}_variants": variants}
+    )
+    if not updated:
+        delete_variants(field_file.storage, variants)
+        return None
+    if old_variants.get("source") != field_file.name:
+        delete_variants(field_file.storage, old_variants)
+    if content_filters is not None:
+        bump_content_version(**content_filters(instance))
+    return variants
+
+
+def pending_variants(model):
+    """
+    Rows whose variants were not built from their current image, including
+    rows whose image was removed. Saving an image only changes the name, so
+    this is the queue the generate_image_variants command works through.
+    """
+    field, _ = IMAGE_FIELDS[model]
+    return model.objects.alias(
+        image_name=Coalesce(F(field), Value(""), output_field=CharField()),
+        variants_source=Coalesce(
+            KeyTextTransform("source", f"{field}_variants"),
+            Value(""),
+            output_field=CharField(),
+        ),
+    ).exclude(image_name=F("variants_source"))
+
+
+def build_pending_variants(model, failed):
+    """
+    Build the variants of every pending row of ``model`` and return how many
+    were built. Images that fail are logged and added to ``failed``, a set of
+    ``(model, pk, name)``, so a watching worker does not retry them until
+    they are replaced.
+    """
+    field, _ = IMAGE_FIELDS[model]
+    built = 0
+    for pk, name in pending_variants(model).values_list("pk", field).iterator():
+        if (model, pk, name) in failed:
+            continue
+        try:
+            generate_image_variants(model, pk)
+        except Exception:
+            logger.exception("Could not build image variants of %s %s", model, pk)
+            failed.add((model, pk, name))
+        else:
+            built += 1
+    return built
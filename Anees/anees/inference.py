@@ -0,0 +1,277 @@
+import asyncio
+import wave
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .audio import clean_signal, log_mel_spectrogram
+
+# log of the floor log_mel_spectrogram adds to every mel energy
+SILENT_LOG_MEL = float(np.log(1e-10))
+
+
+class LogMelFeatures:
+    """
+    The input a model was trained on, read from the model file: the WAV
+    recording as mono ``sample_rate`` audio, trimmed and normalized like the
+    audio pipeline does, then ``frames`` log mel frames of ``n_mels`` bands,
+    flattened. Shorter recordings are padded with silence, longer ones cut.
+    """
+
+    name = "log_mel"
+
+    def __init__(self, sample_rate=16000, n_mels=40, frames=100):
+        self.sample_rate = int(sample_rate)
+        self.n_mels = int(n_mels)
+        self.frames = int(frames)
+
+    @classmethod
+    def from_metadata(cls, metadata):
+        name = str(metadata.get("features", cls.name))
+        if name != cls.name:
+            raise ImproperlyConfigured(f"The model takes unknown features {name!r}")
+        defaults = cls()
+        return cls(
+            metadata.get("sample_rate", defaults.sample_rate),
+            metadata.get("n_mels", defaults.n_mels),
+            metadata.get("frames", defaults.frames),
+        )
+
+    def metadata(self):
+        return {
+            "features": self.name,
+            "sample_rate": self.sample_rate,
+            "n_mels": self.n_mels,
+            "frames": self.frames,
+        }
+
+    @property
+    def input_size(self):
+        return self.frames * self.n_mels
+
+    def extract(self, upload):
+        """Features of a WAV upload, bytes or a file; raises wave.Error otherwise."""
+        if not isinstance(upload, bytes):
+            upload.seek(0)
+        signal = clean_signal(upload, self.sample_rate)
+        mel = log_mel_spectrogram(signal, self.sample_rate, self.n_mels)
+        mel = mel[: self.frames]
+        if len(mel) < self.frames:
+            padding = ((0, self.frames - len(mel)), (0, 0))
+            mel = np.pad(mel, padding, constant_values=SILENT_LOG_MEL)
+        return mel.ravel().astype(np.float32)
+
+
+class NumpyModel:
+    """
+    A two layer perceptron stored as an ``.npz`` archive holding ``w1``,
+    ``b1``, ``w2``, ``b2``, the ``labels`` of its outputs and the
+    LogMelFeatures metadata (``features``, ``sample_rate``, ``n_mels``,
+    ``frames``) describing its input.
+    """
+
+    def __init__(self, w1, b1, w2, b2, labels, features=None):
+        self.w1 = np.asarray(w1, dtype=np.float32)
+        self.b1 = np.asarray(b1, dtype=np.float32)
+        self.w2 = np.asarray(w2, dtype=np.float32)
+        self.b2 = np.asarray(b2, dtype=np.float32)
+        self.labels = [str(label) for label in labels]
+        self.features = features or LogMelFeatures()
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as weights:
+            metadata = {
+                key: weights[key].item()
+                for key in LogMelFeatures().metadata()
+                if key in weights
+            }
+            return cls(
+                weights["w1"],
+                weights["b1"],
+                weights["w2"],
+                weights["b2"],
+                weights["labels"],
+                LogMelFeatures.from_metadata(metadata),
+            )
+
+    @classmethod
+    def random(cls, input_size=None, hidden=128, labels=10, seed=0, features=None):
+        features = features or LogMelFeatures()
+        input_size = input_size or features.input_size
+        generator = np.random.default_rng(seed)
+        return cls(
+            generator.standard_normal((input_size, hidden)) / np.sqrt(input_size),
+            np.zeros(hidden),
+            generator.standard_normal((hidden, labels)) / np.sqrt(hidden),
+            np.zeros(labels),
+            [f"label{index}" for index in range(labels)],
+            features,
+        )
+
+    def save(self, path):
+        np.savez(
+            path,
+            w1=self.w1,
+            b1=self.b1,
+            w2=self.w2,
+            b2=self.b2,
+            labels=np.array(self.labels),
+            **{key: np.array(value) for key, value in self.features.metadata().items()},
+        )
+
+    @property
+    def input_size(self):
+        return self.w1.shape[0]
+
+    def predict_batch(self, features):
+        """Class probabilities for a ``(batch, input_size)`` array of features."""
+        hidden = np.maximum(features @ self.w1 + self.b1, 0)
+        logits = hidden @ self.w2 + self.b2
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+class OnnxModel:
+    """
+    An ONNX classifier run by ONNX Runtime on the CPU. It takes one float
+    input of shape ``(batch, input_size)``. Its output labels are read from
+    the comma separated ``labels`` metadata entry and its LogMelFeatures from
+    the ``features``, ``sample_rate``, ``n_mels`` and ``frames`` entries.
+    """
+
+    def __init__(self, path):
+        try:
+            import onnxruntime
+        except ImportError as error:
+            raise ImproperlyConfigured(
+                "onnxruntime must be installed to serve .onnx models"
+            ) from error
+        self.session = onnxruntime.InferenceSession(
+            str(path), providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.labels = metadata.get("labels", "").split(",")
+        self.features = LogMelFeatures.from_metadata(metadata)
+        # a dynamic dimension is a name like "features" or None
+        size = model_input.shape[1]
+        self.input_size = size if isinstance(size, int) else self.features.input_size
+
+    def predict_batch(self, features):
+        return self.session.run(None, {self.input_name: features})[0]
+
+
+def load_model(path):
+    if str(path).endswith(".onnx"):
+        return OnnxModel(path)
+    return NumpyModel.load(path)
+
+
+class MicroBatcher:
+    """
+    Collect concurrent predictions into batches. A batch closes once it has
+    ``max_batch_size`` items or ``max_wait`` seconds after its first item
+    arrived, then runs in a thread so the event loop stays free to collect
+    the next one.
+    """
+
+    def __init__(self, run_batch, max_batch_size, max_wait):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self._loop = None
+        self._queue = None
+        self._collector = None
+
+    def _bind(self):
+        # like the model client, the queue belongs to the loop that made it
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._collector = loop.create_task(self._collect())
+        return self._queue
+
+    async def submit(self, features):
+        future = asyncio.get_running_loop().create_future()
+        await self._bind().put((features, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            inputs = np.stack([features for features, _ in batch])
+            self.batches += 1
+            try:
+                outputs = await loop.run_in_executor(None, self.run_batch, inputs)
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
+
+
+class LocalModelBackend:
+    """
+    Prediction backend that runs the model inside the API process. The model
+    is loaded once per worker and concurrent requests share batched calls.
+    It answers like the remote model server: ``{"result": ["passed" or
+    "failed", score]}``, passed when the model ranks the expected label
+    first, with the label's probability as a 0-100 score.
+    """
+
+    # the model file defines its own preprocessing, see LogMelFeatures
+    preprocesses_audio = True
+
+    def __init__(self, model, max_batch_size, max_wait):
+        if model.input_size != model.features.input_size:
+            raise ImproperlyConfigured(
+                f"The local model takes {model.input_size} inputs, its "
+                f"features have {model.features.input_size}"
+            )
+        self.model = model
+        self.batcher = MicroBatcher(model.predict_batch, max_batch_size, max_wait)
+
+    @classmethod
+    def from_settings(cls):
+        if not settings.LOCAL_MODEL_PATH:
+            raise ImproperlyConfigured(
+                "LOCAL_MODEL_PATH must name the model of the local backend"
+            )
+        return cls(
+            load_model(settings.LOCAL_MODEL_PATH),
+            settings.PREDICTION_MAX_BATCH_SIZE,
+            settings.PREDICTION_MAX_BATCH_WAIT,
+        )
+
+    async def predict(self, label, filename, upload, content_type=None):
+        try:
+            features = await asyncio.to_thread(self.model.features.extract, upload)
+        except (wave.Error, EOFError, ValueError):
+            return 400, {"error": "The Recording Must Be A WAV File"}
+        probabilities = await self.batcher.submit(features)
+        if label not in self.model.labels:
+            return 200, {"result": ["failed", 0]}
+        expected = self.model.labels.index(label)
+        passed = int(np.argmax(probabilities)) == expected
+        score = round(float(probabilities[expected]) * 100)
+        return 200, {"result": ["passed" if passed else "failed", score]}
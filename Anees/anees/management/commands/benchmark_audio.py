@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from anees.audio import encode_wav, preprocess_audio
+from anees.prediction import get_predictor
+
+
+def synthetic_recording(seconds, rate, channels, silence):
+    """A wide, multi-channel voice-like recording padded with near silence."""
+    generator = np.random.default_rng(0)
+    time_axis = np.arange(int(seconds * rate)) / rate
+    voice = 0.5 * np.sin(2 * np.pi * 220 * time_axis) * np.sin(np.pi * time_axis)
+    voice += 0.05 * generator.standard_normal(len(time_axis))
+    quiet = 0.001 * generator.standard_normal(int(silence * rate))
+    signal = np.concatenate([quiet, voice, quiet]).astype(np.float32)
+    return encode_wav(np.repeat(signal[:, None], channels, axis=1), rate)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the payload size and latency of the audio preprocessing "
+        "pipeline on a synthetic recording, and optionally the end-to-end "
+        "prediction latency through the configured backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument("--rate", type=int, default=44100)
+        parser.add_argument("--channels", type=int, default=2)
+        parser.add_argument(
+            "--silence", type=float, default=1, help="Seconds of silence per end."
+        )
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument(
+            "--predict",
+            action="store_true",
+            help="Also send the raw and preprocessed payloads to the predictor.",
+        )
+
+    def handle(self, *args, **options):
+        raw = synthetic_recording(
+            options["seconds"], options["rate"], options["channels"], options["silence"]
+        )
+        target_rate = settings.PREDICTION_SAMPLE_RATE
+        self.stdout.write(
+            f"Raw upload: {len(raw) / 1024:.1f} KiB "
+            f"({options['channels']} channels at {options['rate']} Hz)"
+        )
+        for features in (False, True):
+            payload, content_type = preprocess_audio(raw, target_rate, features)
+            elapsed = self.best_of(
+                options["repeat"], lambda: preprocess_audio(raw, target_rate, features)
+            )
+            self.stdout.write(
+                f"{content_type}: {len(payload) / 1024:.1f} KiB "
+                f"({len(raw) / len(payload):.1f}x smaller), "
+                f"preprocessed in {elapsed * 1000:.1f} ms"
+            )
+
+        if options["predict"]:
+            predictor = get_predictor()
+
+            async def predict(payload):
+                return await predictor.predict("benchmark", "audio.wav", payload)
+
+            start = time.perf_counter()
+            asyncio.run(predict(raw))
+            self.report_latency("raw", start)
+            start = time.perf_counter()
+            asyncio.run(predict(preprocess_audio(raw, target_rate)[0]))
+            self.report_latency("preprocessed", start)
+
+    def report_latency(self, name, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"End to end with {name} audio: {elapsed * 1000:.1f} ms")
+
+    def best_of(self, repeat, function):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from anees.inference import MicroBatcher, NumpyModel, load_model
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the local prediction model on single items "
+        "with vectorized batches, directly and through the micro-batcher."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            help="Model file to benchmark. A random NumPy model is used if omitted.",
+        )
+        parser.add_argument("--items", type=int, default=4096)
+        parser.add_argument(
+            "--batch-sizes",
+            default="1,8,32,128",
+            help="Comma separated batch sizes to time.",
+        )
+        parser.add_argument(
+            "--max-wait",
+            type=float,
+            default=0.005,
+            help="Micro-batcher wait, in seconds.",
+        )
+
+    def handle(self, *args, **options):
+        if options["model"]:
+            model = load_model(options["model"])
+        else:
+            model = NumpyModel.random()
+        items = options["items"]
+        features = np.random.default_rng(0).random(
+            (items, model.input_size), dtype=np.float32
+        )
+        batch_sizes = [int(size) for size in options["batch_sizes"].split(",")]
+
+        self.stdout.write("Direct calls:")
+        baseline = None
+        for size in batch_sizes:
+            rate = self.time_direct(model, features, size)
+            baseline = baseline or rate
+            self.report(size, rate, baseline)
+
+        self.stdout.write(f"{items} concurrent requests through the micro-batcher:")
+        baseline = None
+        for size in batch_sizes:
+            rate, batches = asyncio.run(
+                self.time_batcher(model, features, size, options["max_wait"])
+            )
+            baseline = baseline or rate
+            self.report(size, rate, baseline, f", {batches} batches")
+
+    def time_direct(self, model, features, size):
+        start = time.perf_counter()
+        for index in range(0, len(features), size):
+            model.predict_batch(features[index : index + size])
+        return len(features) / (time.perf_counter() - start)
+
+    async def time_batcher(self, model, features, size, max_wait):
+        batcher = MicroBatcher(model.predict_batch, size, max_wait)
+        start = time.perf_counter()
+        await asyncio.gather(*(batcher.submit(row) for row in features))
+        return len(features) / (time.perf_counter() - start), batcher.batches
+
+    def report(self, size, rate, baseline, extra=""):
+        self.stdout.write(
+            f"  batch size {size:>4}: {rate:>10.0f} items/s "
+            f"({rate / baseline:.1f}x single item{extra})"
+        )
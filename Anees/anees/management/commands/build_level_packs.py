@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from anees.models import Level
+from anees.packs import build_stale_packs, parse_level_range
+
+
+class Command(BaseCommand):
+    help = "Build the offline packs of the levels whose content changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--levels", help="Level number or range to build, e.g. 3 or 3-5."
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild the packs even if their content did not change.",
+        )
+        parser.add_argument(
+            "--watch",
+            type=float,
+            metavar="SECONDS",
+            help="Keep running, checking for changed levels every SECONDS.",
+        )
+
+    def handle(self, *args, **options):
+        levels = Level.objects.all()
+        if options["levels"]:
+            try:
+                first, last = parse_level_range(options["levels"])
+            except ValueError as error:
+                raise CommandError(error)
+            levels = levels.filter(level_num__range=(first, last))
+
+        force = options["force"]
+        while True:
+            close_old_connections()
+            built = 0
+            for pack in build_stale_packs(levels, force):
+                built += 1
+                self.stdout.write(f"{pack.level}: {pack.file.name} ({pack.size} bytes)")
+            if not options["watch"]:
+                self.stdout.write(self.style.SUCCESS(f"Built {built} level packs"))
+                return
+            force = False
+            time.sleep(options["watch"])
@@ -0,0 +1,37 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from anees.chunked_uploads import delete_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete chunked uploads nobody touched for a while, with their parts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=float,
+            help="Age after which an upload is stale (CHUNKED_UPLOAD_EXPIRY).",
+        )
+        parser.add_argument(
+            "--watch",
+            type=float,
+            metavar="SECONDS",
+            help="Keep running, deleting stale uploads every SECONDS.",
+        )
+
+    def handle(self, *args, **options):
+        older_than = settings.CHUNKED_UPLOAD_EXPIRY
+        if options["hours"] is not None:
+            older_than = timedelta(hours=options["hours"])
+        while True:
+            close_old_connections()
+            deleted = delete_stale_uploads(older_than)
+            self.stdout.write(f"{deleted} stale uploads deleted")
+            if not options["watch"]:
+                return
+            time.sleep(options["watch"])
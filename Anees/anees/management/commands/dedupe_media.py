@@ -0,0 +1,48 @@
+from django.core.files.storage import default_storage, get_storage_class
+from django.core.management.base import BaseCommand, CommandError
+
+from anees.content import bump_content_version
+from anees.images import IMAGE_FIELDS, generate_image_variants
+from anees.media import GAME_MEDIA
+from anees.storage import ContentAddressedMixin, file_fields, is_content_addressed
+
+
+class Command(BaseCommand):
+    help = (
+        "Move media stored under its upload name to content-addressed blobs, "
+        "so identical files are kept once."
+    )
+
+    def handle(self, *args, **options):
+        if not issubclass(get_storage_class(), ContentAddressedMixin):
+            raise CommandError("DEFAULT_FILE_STORAGE is not content addressed.")
+
+        for model, field in file_fields():
+            select_related = GAME_MEDIA.get(model, (None, []))[1]
+            rows = (
+                model._default_manager.select_related(*select_related)
+                .exclude(**{field.name: ""})
+                .exclude(**{field.name: None})
+            )
+            moved, blobs = 0, set()
+            for row in rows.iterator():
+                name = getattr(row, field.name).name
+                if is_content_addressed(name) or not default_storage.exists(name):
+                    continue
+                with default_storage.open(name) as file:
+                    blob = default_storage.save(name, file)
+                model._default_manager.filter(pk=row.pk, **{field.name: name}).update(
+                    **{field.name: blob}
+                )
+                # only goes once no other row still uses the old name
+                default_storage.delete(name)
+                if model in IMAGE_FIELDS:
+                    generate_image_variants(model, row.pk)
+                if model in GAME_MEDIA:
+                    bump_content_version(pk=GAME_MEDIA[model][2](row))
+                moved += 1
+                blobs.add(blob)
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: "
+                f"{moved} files moved to {len(blobs)} blobs"
+            )
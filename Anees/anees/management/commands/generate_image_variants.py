@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from anees.images import IMAGE_FIELDS, build_pending_variants, generate_image_variants
+
+
+class Command(BaseCommand):
+    help = "Build the resized copies of game and profile images that lack them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild every image, e.g. after changing IMAGE_VARIANT_SIZES.",
+        )
+        parser.add_argument(
+            "--watch",
+            type=float,
+            metavar="SECONDS",
+            help="Keep running, checking for new images every SECONDS.",
+        )
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            self.rebuild_all()
+        failed = set()
+        while True:
+            close_old_connections()
+            for model in IMAGE_FIELDS:
+                built = build_pending_variants(model, failed)
+                if built or not options["watch"]:
+                    name = model._meta.verbose_name_plural
+                    self.stdout.write(f"{name}: {built} built")
+            if not options["watch"]:
+                return
+            time.sleep(options["watch"])
+
+    def rebuild_all(self):
+        for model, (field, _) in IMAGE_FIELDS.items():
+            rows = model.objects.exclude(**{field: ""}).exclude(**{field: None})
+            for pk in rows.values_list("pk", flat=True).iterator():
+                generate_image_variants(model, pk)
+            self.stdout.write(f"{model._meta.verbose_name_plural}: rebuilt")
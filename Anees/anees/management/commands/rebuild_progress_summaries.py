@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from anees.models import Child
+from anees.progress import refresh_progress
+
+
+class Command(BaseCommand):
+    help = "Rebuild every child's progress summary from the ChildLevel history."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of children aggregated per query.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_pk = None
+        rebuilt = 0
+        while True:
+            children = Child.objects.order_by("pk")
+            if last_pk is not None:
+                children = children.filter(pk__gt=last_pk)
+            batch = list(children.values_list("pk", flat=True)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                refresh_progress(*batch)
+            rebuilt += len(batch)
+            last_pk = batch[-1]
+            self.stdout.write(f"Rebuilt {rebuilt} summaries")
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {rebuilt} summaries rebuilt"))
@@ -0,0 +1,36 @@
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from anees.prediction_jobs import run_prediction_worker
+
+
+class Command(BaseCommand):
+    help = "Run queued prediction jobs against the model server."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.PREDICTION_WORKER_CONCURRENCY,
+            help="Number of predictions in flight at once.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.PREDICTION_JOB_POLL_INTERVAL,
+            help="Seconds between checks of an empty queue.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Stop when the queue is empty instead of waiting for more jobs.",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"Running prediction jobs, {options['concurrency']} at a time"
+        )
+        async_to_sync(run_prediction_worker)(
+            options["concurrency"], options["poll_interval"], options["once"]
+        )
@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from anees.models import LevelProvisioningJob
+from anees.provisioning import run_provisioning_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Run level provisioning jobs as they are queued, resuming the ones "
+        "whose runner went away."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.LEVEL_PROVISIONING_POLL_INTERVAL,
+            help="Seconds between checks for new jobs.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Stop when no job is left instead of waiting for more.",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Run failed jobs again too.",
+        )
+
+    def handle(self, *args, **options):
+        finished = [LevelProvisioningJob.DONE]
+        if not options["retry_failed"]:
+            finished.append(LevelProvisioningJob.FAILED)
+        while True:
+            close_old_connections()
+            jobs = list(
+                LevelProvisioningJob.objects.exclude(status__in=finished).order_by(
+                    "created_at"
+                )
+            )
+            for job in jobs:
+                self.run(job)
+            if options["once"]:
+                return
+            # a failed job is only retried when asked to
+            finished = [LevelProvisioningJob.DONE, LevelProvisioningJob.FAILED]
+            if not jobs:
+                time.sleep(options["poll_interval"])
+
+    def run(self, job):
+        self.stdout.write(f"Provisioning {job.level} ({job.processed}/{job.total})")
+        run_provisioning_job(job.pk)
+        job.refresh_from_db()
+        self.stdout.write(
+            f"{job.get_status_display()}: {job.processed}/{job.total} children"
+        )
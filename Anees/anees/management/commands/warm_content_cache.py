@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from anees.content import warm_game_content
+from anees.models import Level
+
+
+class Command(BaseCommand):
+    help = "Serialize every level's games into the content cache."
+
+    def handle(self, *args, **options):
+        warmed = 0
+        for level in Level.objects.iterator():
+            warm_game_content(level)
+            warmed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Warmed the content of {warmed} levels"))
@@ -0,0 +1,167 @@
+import mimetypes
+import os
+import posixpath
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from PIL import Image
+
+from .models import Child, ChildLevel, Expressive, LevelPack, ReceptiveImage, Social
+from .storage import is_content_addressed
+
+# model -> (file field, related objects to load, level id of a row)
+GAME_MEDIA = {
+    ReceptiveImage: ("img", ["receptive"], lambda image: image.receptive.level_id),
+    Expressive: ("img", [], lambda game: game.level_id),
+    Social: ("video", [], lambda game: game.level_id),
+    LevelPack: ("file", [], lambda pack: pack.level_id),
+}
+
+# extension -> content type of the files uploads may store
+IMAGE_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+VIDEO_TYPES = {
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+    ".mov": "video/quicktime",
+}
+
+# direct upload target -> (model, file field, open to every user, file types)
+UPLOAD_TARGETS = {
+    "child.picture": (Child, "picture", True, IMAGE_TYPES),
+    "receptiveimage.img": (ReceptiveImage, "img", False, IMAGE_TYPES),
+    "expressive.img": (Expressive, "img", False, IMAGE_TYPES),
+    "social.video": (Social, "video", False, VIDEO_TYPES),
+}
+
+
+def clean_media_name(name):
+    """The storage name of a requested path, or None if it leaves MEDIA_ROOT."""
+    cleaned = posixpath.normpath(name)
+    if cleaned.startswith(("/", "../")) or cleaned in (".", ".."):
+        return None
+    return cleaned
+
+
+def stored_names(instance, field):
+    names = {getattr(instance, field).name}
+    for size, variants in getattr(instance, f"{field}_variants", {}).items():
+        if size != "source":
+            names.update(variants.values())
+    return names
+
+
+def find_rows(model, field, name, select_related=()):
+    """
+    Rows of ``model`` whose file, or one of its resized variants, is stored
+    under ``name``. Variants are named ``<original root>.<size>.<ext>``, so
+    they are looked up by the original's root.
+    """
+    if not name.startswith(model._meta.get_field(field).upload_to + "/"):
+        return []
+    lookup = Q(**{field: name})
+    root, _, extension = name.rpartition(".")
+    root, _, size = root.rpartition(".")
+    if size in settings.IMAGE_VARIANT_SIZES:
+        lookup |= Q(**{f"{field}__startswith": f"{root}."})
+    rows = model.objects.select_related(*select_related).filter(lookup)
+    return [row for row in rows if name in stored_names(row, field)]
+
+
+def can_access_media(user, name):
+    """
+    Whether ``user`` may download the media file ``name``: children see their
+    own picture and the game media of the levels they have unlocked, staff
+    see every stored file. Returns None when the file is unknown.
+    """
+    children = find_rows(Child, "picture", name)
+    if children:
+        # identical pictures share one blob, so any of its owners may see it
+        return user.is_staff or any(child.pk == user.pk for child in children)
+    for model, (field, select_related, level_id) in GAME_MEDIA.items():
+        rows = find_rows(model, field, name, select_related)
+        if rows:
+            return (
+                user.is_staff
+                or ChildLevel.objects.filter(
+                    child_id=user.pk, level_id__in=[level_id(row) for row in rows]
+                ).exists()
+            )
+    if user.is_staff and default_storage.exists(name):
+        return True
+    return None
+
+
+def media_content_type(name):
+    content_type, _ = mimetypes.guess_type(name)
+    return content_type or "application/octet-stream"
+
+
+def is_inline_media(name):
+    """Whether ``name`` is an image or video a browser may show in the page."""
+    extension = os.path.splitext(name)[1].lower()
+    return extension in IMAGE_TYPES or extension in VIDEO_TYPES
+
+
+def media_cache_control(name):
+    # a content-addressed name always refers to the same bytes
+    if is_content_addressed(name):
+        return "private, max-age=31536000, immutable"
+    return "private, max-age=3600"
+
+
+def upload_field(target):
+    model, field, _, _ = UPLOAD_TARGETS[target]
+    return model._meta.get_field(field)
+
+
+def upload_target(model, field):
+    for target, (target_model, target_field, _, _) in UPLOAD_TARGETS.items():
+        if target_model is model and target_field == field:
+            return target
+    return None
+
+
+def upload_content_type(target, filename, declared=None):
+    """
+    The content type a file named ``filename`` is stored with under
+    ``target``, from its extension, or None if the target doesn't take it or
+    the ``declared`` content type isn't one it takes.
+    """
+    types = UPLOAD_TARGETS[target][3]
+    if declared is not None and declared not in types.values():
+        return None
+    return types.get(os.path.splitext(filename)[1].lower())
+
+
+def upload_max_size(target):
+    if UPLOAD_TARGETS[target][3] is IMAGE_TYPES:
+        return settings.IMAGE_UPLOAD_MAX_SIZE
+    return settings.CHUNKED_UPLOAD_MAX_SIZE
+
+
+def is_valid_upload(target, file):
+    """
+    Whether the content of ``file`` is what ``target`` takes. Images are
+    checked with Pillow; videos are only ever served as their own type.
+    """
+    if UPLOAD_TARGETS[target][3] is not IMAGE_TYPES:
+        return True
+    try:
+        with Image.open(file) as image:
+            image.verify()
+    except (Image.DecompressionBombError, OSError, SyntaxError, ValueError):
+        return False
+    return True
+
+
+def upload_name(target, digest, filename):
+    """The content-addressed name a direct upload to ``target`` is stored as."""
+    extension = os.path.splitext(filename)[1].lower()
+    return f"{upload_field(target).upload_to}/{digest}{extension}"
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anees', '0002_alter_childlevel_options_child_date_joined'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChildProgressSummary',
+            fields=[
+                ('child', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='progress', serialize=False, to='anees.child')),
+                ('current_level', models.PositiveIntegerField(default=0)),
+                ('completed_levels', models.PositiveIntegerField(default=0)),
+                ('receptive_accuracy', models.FloatField(default=0)),
+                ('expressive_accuracy', models.FloatField(default=0)),
+                ('social_accuracy', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Children Progress Summaries',
+            },
+        ),
+    ]
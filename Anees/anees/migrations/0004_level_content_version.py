@@ -0,0 +1,18 @@
+# Generated by Django 4.1.7 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("anees", "0003_childprogresssummary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="level",
+            name="content_version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.1.7 on 2026-10-18 12:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("anees", "0004_level_content_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="childlevel",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="level",
+            name="content_updated_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+    ]
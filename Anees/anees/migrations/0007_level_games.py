@@ -0,0 +1,34 @@
+# Generated by Django 4.1.7 on 2026-10-18 12:10
+
+from django.db import migrations, models
+from django.db.models import Case, Exists, OuterRef, Value, When
+
+GAME_FLAGS = {"receptive": 1, "expressive": 2, "social": 4}
+
+
+def fill_level_games(apps, schema_editor):
+    Level = apps.get_model("anees", "Level")
+    games = Value(0)
+    for game, flag in GAME_FLAGS.items():
+        model = apps.get_model("anees", game.capitalize())
+        games = games + Case(
+            When(Exists(model.objects.filter(level=OuterRef("pk"))), then=Value(flag)),
+            default=Value(0),
+        )
+    Level.objects.update(games=games)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("anees", "0006_levelprovisioningjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="level",
+            name="games",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_level_games, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.7 on 2026-10-18 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("anees", "0008_predictionjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="child",
+            name="picture_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="expressive",
+            name="img_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="receptiveimage",
+            name="img_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.1.7 on 2026-10-18 12:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("anees", "0009_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LevelPack",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("content_version", models.PositiveIntegerField()),
+                ("file", models.FileField(upload_to="packs")),
+                ("digest", models.CharField(max_length=64)),
+                ("size", models.PositiveBigIntegerField()),
+                ("built_at", models.DateTimeField(auto_now=True)),
+                (
+                    "level",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pack",
+                        to="anees.level",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["level"],
+            },
+        ),
+    ]
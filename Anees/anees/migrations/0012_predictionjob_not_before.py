@@ -0,0 +1,18 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("anees", "0011_chunkedupload"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="predictionjob",
+            name="not_before",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
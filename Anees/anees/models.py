@@ -1,16 +1,48 @@
+import uuid
 from django.db import models
 from datetime import date
 from django.contrib.auth import get_user_model
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+from django.db.models.functions import Now
 from django.utils import timezone
 
+from .fields import ChunkedFileField
+
 User = get_user_model()
 
 
+class ChildQuerySet(models.QuerySet):
+    def with_progress(self):
+        """
+        Annotate every child with the values ChildSerializer reports, computed
+        in a single grouped query instead of per-row lookups.
+        """
+        completed = Q(
+            levels__receptive_complete=True,
+            levels__expressive_complete=True,
+            levels__social_complete=True,
+        )
+        return self.annotate(
+            current_level=Count("levels"),
+            completed_levels=Count("levels", filter=completed),
+            receptive_accuracy=Avg("levels__receptive_score", filter=completed),
+            expressive_accuracy=Avg("levels__expressive_score", filter=completed),
+            social_accuracy=Avg("levels__social_score", filter=completed),
+            join_duration=ExpressionWrapper(
+                Now() - F("date_joined"), output_field=DurationField()
+            ),
+        )
+
+
 class Child(models.Model):
     picture = models.ImageField(upload_to="profile/images", null=True, blank=True)
+    # resized copies of the picture, see anees.images
+    picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
     date_joined = models.DateTimeField(default=timezone.now)
 
+    objects = ChildQuerySet.as_manager()
+
     # levels
     class Meta:
         verbose_name_plural = "Children"
@@ -41,13 +73,44 @@ class Child(models.Model):
         return self.full_name
 
 
+class ChildProgressSummary(models.Model):
+    child = models.OneToOneField(
+        Child, on_delete=models.CASCADE, primary_key=True, related_name="progress"
+    )
+    current_level = models.PositiveIntegerField(default=0)
+    completed_levels = models.PositiveIntegerField(default=0)
+    receptive_accuracy = models.FloatField(default=0)
+    expressive_accuracy = models.FloatField(default=0)
+    social_accuracy = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Children Progress Summaries"
+
+    def __str__(self) -> str:
+        return f"{self.child.full_name}'s Progress"
+
+
 class Level(models.Model):
+    RECEPTIVE = 1
+    EXPRESSIVE = 2
+    SOCIAL = 4
+    GAME_FLAGS = {"receptive": RECEPTIVE, "expressive": EXPRESSIVE, "social": SOCIAL}
+
     level_num = models.IntegerField(unique=True)
+    # bitmask of the games the level has, kept in sync by the game signals
+    games = models.PositiveSmallIntegerField(default=0, editable=False)
+    # bumped whenever any of the level's game content changes
+    content_version = models.PositiveIntegerField(default=1, editable=False)
+    content_updated_at = models.DateTimeField(default=timezone.now, editable=False)
     # receptive
     # expressive
     # social
     # children
 
+    def has_game(self, game) -> bool:
+        return bool(self.games & self.GAME_FLAGS[game])
+
     def __str__(self) -> str:
         return f"Level {self.level_num}"
 
@@ -55,6 +118,37 @@ class Level(models.Model):
         ordering = ["level_num"]
 
 
+class LevelProvisioningJob(models.Model):
+    PENDING = "P"
+    RUNNING = "R"
+    DONE = "D"
+    FAILED = "F"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+    level = models.ForeignKey(
+        Level, on_delete=models.CASCADE, related_name="provisioning_jobs"
+    )
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=PENDING)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    # children are provisioned in primary key order, so this is where a
+    # resumed job picks up
+    last_child_id = models.BigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"Provisioning {self.level}"
+
+
 class ChildLevel(models.Model):
     child = models.ForeignKey(Child, on_delete=models.CASCADE, related_name="levels")
     level = models.ForeignKey(Level, on_delete=models.CASCADE, related_name="children")
@@ -66,6 +160,7 @@ class ChildLevel(models.Model):
     social_score = models.SmallIntegerField(default=0)
     joined_date = models.DateField(auto_now_add=True)
     completed_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     @property
     def completed(self):
@@ -101,6 +196,7 @@ class Receptive(models.Model):
 
 class ReceptiveImage(models.Model):
     img = models.ImageField(upload_to="level/receptive")
+    img_variants = models.JSONField(default=dict, blank=True, editable=False)
     name = models.CharField(max_length=255)
     receptive = models.ForeignKey(
         Receptive, on_delete=models.CASCADE, related_name="images"
@@ -115,6 +211,7 @@ class ReceptiveImage(models.Model):
 
 class Expressive(models.Model):
     img = models.ImageField(upload_to="level/expressive")
+    img_variants = models.JSONField(default=dict, blank=True, editable=False)
     answer = models.CharField(max_length=255)
     level = models.OneToOneField(Level, on_delete=models.CASCADE)
 
@@ -126,7 +223,7 @@ class Expressive(models.Model):
 
 
 class Social(models.Model):
-    video = models.FileField(upload_to="level/social")
+    video = ChunkedFileField(upload_to="level/social")
     level = models.OneToOneField(Level, on_delete=models.CASCADE)
 
     # messages
@@ -148,3 +245,103 @@ class conversionMessage(models.Model):
 
     def __str__(self) -> str:
         return f"Message For {self.social.level}"
+
+
+class LevelPack(models.Model):
+    """
+    Offline archive of a level's game content and media, see anees.packs.
+    The file is named after its sha256, so it can be cached forever.
+    """
+
+    level = models.OneToOneField(Level, on_delete=models.CASCADE, related_name="pack")
+    # the level content version the archive was built from
+    content_version = models.PositiveIntegerField()
+    file = models.FileField(upload_to="packs")
+    digest = models.CharField(max_length=64)
+    size = models.PositiveBigIntegerField()
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["level"]
+
+    @property
+    def stale(self):
+        """The level's content changed since the archive was built."""
+        return self.content_version != self.level.content_version
+
+    def __str__(self) -> str:
+        return f"{self.level}'s Pack"
+
+
+class PredictionJob(models.Model):
+    PENDING = "P"
+    RUNNING = "R"
+    DONE = "D"
+    FAILED = "F"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="prediction_jobs"
+    )
+    label = models.CharField(max_length=255)
+    # the upload is removed once the job has finished
+    file = models.FileField(upload_to="predictions", blank=True)
+    digest = models.CharField(max_length=64)
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # a job retried after the model was unavailable waits until then
+    not_before = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["status", "created_at"], name="prediction_job_queue_idx"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"Prediction {self.id} ({self.get_status_display()})"
+
+
+class ChunkedUpload(models.Model):
+    """
+    A file uploaded in chunks through anees.chunked_uploads. The bytes are
+    appended to a part file until ``offset`` reaches ``size``, then the file
+    is stored and its name recorded.
+    """
+
+    UPLOADING = "U"
+    COMPLETE = "C"
+    STATUS_CHOICES = [(UPLOADING, "Uploading"), (COMPLETE, "Complete")]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="chunked_uploads"
+    )
+    # one of anees.media.UPLOAD_TARGETS
+    target = models.CharField(max_length=64)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=UPLOADING)
+    name = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"Upload of {self.filename} ({self.get_status_display()})"
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from .content import get_level_content
+from .media import stored_names
+from .models import Expressive, LevelPack, ReceptiveImage, Social
+
+# model -> (file field, lookup from a row to its level)
+PACK_MEDIA = {
+    ReceptiveImage: ("img", "receptive__level"),
+    Expressive: ("img", "level"),
+    Social: ("video", "level"),
+}
+# Entries get a fixed timestamp so the same content always gives a
+# byte-identical archive, and therefore the same name.
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def parse_level_range(value):
+    """Parse ``"3"`` or ``"3-5"`` into ``(first, last)`` level numbers."""
+    first, _, last = value.partition("-")
+    first = int(first)
+    last = int(last) if last else first
+    if first < 1 or last < first:
+        raise ValueError(f"invalid level range {value!r}")
+    return first, last
+
+
+def pack_media_names(level):
+    names = set()
+    for model, (field, level_lookup) in PACK_MEDIA.items():
+        for row in model.objects.filter(**{level_lookup: level}):
+            names.update(name for name in stored_names(row, field) if name)
+    return sorted(names)
+
+
+def zip_info(name, compress_type=zipfile.ZIP_STORED):
+    info = zipfile.ZipInfo(name, ZIP_DATE_TIME)
+    info.compress_type = compress_type
+    info.external_attr = 0o644 << 16
+    return info
+
+
+def write_pack(level, archive):
+    """
+    Write the pack of ``level`` to the binary file ``archive``: every media
+    file of its games under ``media/<storage name>``, stored as is since
+    images and videos are already compressed, and a ``manifest.json`` with
+    the serialized games and the sha256 of each file.
+    """
+    files = {}
+    with zipfile.ZipFile(archive, "w") as pack:
+        for name in pack_media_names(level):
+            if not default_storage.exists(name):
+                continue
+            digest = hashlib.sha256()
+            with default_storage.open(name) as source:
+                with pack.open(zip_info(f"media/{name}"), "w") as target:
+                    for chunk in source.chunks():
+                        digest.update(chunk)
+                        target.write(chunk)
+            files[name] = digest.hexdigest()
+        manifest = {
+            "level_num": level.level_num,
+            "content_version": level.content_version,
+            "media_url": settings.MEDIA_URL,
+            "games": get_level_content(level),
+            "files": files,
+        }
+        pack.writestr(
+            zip_info("manifest.json", zipfile.ZIP_DEFLATED),
+            json.dumps(manifest, indent=2, sort_keys=True),
+        )
+
+
+def file_digest(file):
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(64 * 1024), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_level_pack(level):
+    """
+    Build the pack of ``level`` and record it, replacing the previous one.
+    Archives are named after their sha256, so unchanged content is never
+    stored twice.
+    """
+    upload_to = LevelPack._meta.get_field("file").upload_to
+    with tempfile.TemporaryFile() as archive:
+        write_pack(level, archive)
+        digest = file_digest(archive)
+        size = archive.tell()
+        name = f"{upload_to}/{digest}.zip"
+        if not default_storage.exists(name):
+            archive.seek(0)
+            name = default_storage.save(name, File(archive))
+
+    previous = LevelPack.objects.filter(level=level).first()
+    pack, _ = LevelPack.objects.update_or_create(
+        level=level,
+        defaults={
+            "content_version": level.content_version,
+            "file": name,
+            "digest": digest,
+            "size": size,
+        },
+    )
+    if (
+        previous is not None
+        and previous.file.name != name
+        and not LevelPack.objects.filter(file=previous.file.name).exists()
+    ):
+        default_storage.delete(previous.file.name)
+    return pack
+
+
+def existing_pack(level):
+    try:
+        return level.pack
+    except LevelPack.DoesNotExist:
+        return None
+
+
+def build_stale_packs(levels, force=False):
+    """
+    Build the packs of the ``levels`` that have none or whose content changed
+    since, all of them with ``force``, and yield each new pack.
+    """
+    for level in levels.select_related("pack"):
+        pack = existing_pack(level)
+        if force or pack is None or pack.stale:
+            yield build_level_pack(level)
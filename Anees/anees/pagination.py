@@ -0,0 +1,131 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a compound ordering.
+
+    Every page is fetched with a ``WHERE (a, b, pk) > (x, y, z)`` style filter
+    instead of an OFFSET, so deep pages cost the same as the first one. The
+    last field in ``ordering`` must be unique (usually the primary key).
+    """
+
+    ordering = ("pk",)
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = [f"-{field}" if reverse else field for field in self.ordering]
+        queryset = queryset.order_by(*ordering)
+        try:
+            if position is not None:
+                queryset = queryset.filter(self.keyset_filter(position, reverse))
+            results = list(queryset[: self.page_size + 1])
+        except (TypeError, ValueError, ValidationError):
+            # the cursor holds values the ordering fields cannot take
+            raise NotFound(self.invalid_cursor_message)
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def keyset_filter(self, position, reverse):
+        lookup = "lt" if reverse else "gt"
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            clause = Q(**{f"{field}__{lookup}": position[index]})
+            for previous_field, value in zip(self.ordering[:index], position[:index]):
+                clause &= Q(**{previous_field: value})
+            condition |= clause
+        return condition
+
+    def get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            value = instance
+            for attr in field.split("__"):
+                value = getattr(value, attr)
+            position.append(value)
+        return position
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({"p": position, "r": int(reverse)}, default=str)
+        cursor = urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode()).decode())
+            position = payload["p"]
+            reverse = bool(payload["r"])
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if not all(isinstance(value, (str, int, float)) for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+
+class ChildrenCursorPagination(KeysetPagination):
+    ordering = ("user__first_name", "user__last_name", "pk")
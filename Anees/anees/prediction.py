@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import time
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .audio import prepare_upload
+
+PREDICTION_STATS_KEY = "anees:predict:stats:{}"
+
+
+class ModelUnavailable(Exception):
+    """The model server can't take the prediction right now."""
+
+    def __init__(self, message, status_code=503):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitBreaker:
+    """
+    Stop calling the model server after repeated failures. Once open, calls
+    fail fast until ``recovery_time`` has passed, then a single trial call is
+    let through and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold, recovery_time):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        if self.opened_at is None:
+            return True
+        if self.trial_running:
+            return False
+        if time.monotonic() - self.opened_at < self.recovery_time:
+            return False
+        self.trial_running = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_running = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class ModelClient:
+    """
+    Async client of the remote prediction model server. Connections are pooled and
+    kept alive, at most ``max_concurrency`` predictions are in flight per
+    process, and a circuit breaker sheds load while the server is failing.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        token,
+        connect_timeout,
+        read_timeout,
+        max_connections,
+        max_concurrency,
+        queue_timeout,
+        failure_threshold,
+        recovery_time,
+    ):
+        self.base_url = base_url
+        self.token = token
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.breaker = CircuitBreaker(failure_threshold, recovery_time)
+        self._loop = None
+        self._client = None
+        self._slots = None
+        self._closer = None
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            base_url=settings.AI_MODEL_URL,
+            token=settings.AI_MODEL_TOKEN,
+            connect_timeout=settings.AI_MODEL_CONNECT_TIMEOUT,
+            read_timeout=settings.AI_MODEL_READ_TIMEOUT,
+            max_connections=settings.AI_MODEL_MAX_CONNECTIONS,
+            max_concurrency=settings.AI_MODEL_MAX_CONCURRENCY,
+            queue_timeout=settings.AI_MODEL_QUEUE_TIMEOUT,
+            failure_threshold=settings.AI_MODEL_FAILURE_THRESHOLD,
+            recovery_time=settings.AI_MODEL_RECOVERY_TIME,
+        )
+
+    def _bind(self):
+        # The pool and the semaphore belong to the event loop that made them.
+        # Under ASGI that is one loop per worker; under WSGI every request
+        # runs on a new loop, so they are rebuilt for it.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout, limits=self.limits
+            )
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._closer = loop.create_task(self._close_with_loop(self._client))
+        return self._client, self._slots
+
+    @staticmethod
+    async def _close_with_loop(client):
+        # A loop that finishes cancels its pending tasks and lets them run to
+        # the end, so the pool of that loop is closed on it.
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await client.aclose()
+
+    async def predict(self, label, filename, upload, content_type=None):
+        """
+        Send a file to the model server and return its status and JSON body.
+        ``upload`` is bytes or an open file, which is streamed in chunks.
+        """
+        if not self.breaker.allow():
+            raise ModelUnavailable("The Model Is Unavailable, Try Again Later")
+        # let through while the circuit is open, this call is the trial
+        trial = self.breaker.is_open
+        try:
+            return await self._post(label, filename, upload, content_type)
+        finally:
+            if trial:
+                # however the trial ended, e.g. cancelled with its client
+                self.breaker.trial_running = False
+
+    async def _post(self, label, filename, upload, content_type):
+        client, slots = self._bind()
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise ModelUnavailable("The Model Is Busy, Try Again Later")
+        try:
+            response = await client.post(
+                "/predict",
+                params={"label": label, "access_token": self.token},
+                files={"file": (filename, upload, content_type)},
+            )
+            data = response.json()
+        except httpx.TimeoutException:
+            self.breaker.record_failure()
+            raise ModelUnavailable("The Model Took Too Long To Respond", 504)
+        except (httpx.HTTPError, ValueError):
+            self.breaker.record_failure()
+            raise ModelUnavailable("The Model Is Unavailable, Try Again Later", 502)
+        finally:
+            slots.release()
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response.status_code, data
+
+    async def aclose(self):
+        if self._closer is not None:
+            self._closer.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+        self._loop = self._client = self._slots = self._closer = None
+
+
+_predictor = None
+
+
+def get_predictor():
+    """
+    The prediction backend named by ``PREDICTION_BACKEND``, built once per
+    process: the remote ModelClient, or a local in-process model.
+    """
+    global _predictor
+    if _predictor is None:
+        _predictor = import_string(settings.PREDICTION_BACKEND).from_settings()
+    return _predictor
+
+
+@receiver(setting_changed)
+def reset_predictor(setting, **kwargs):
+    global _predictor
+    if setting.startswith(("AI_MODEL_", "PREDICTION_", "LOCAL_MODEL_")):
+        _predictor = None
+
+
+async def prepare_for_model(filename, upload, content_type):
+    """
+    Run an upload through the audio preprocessing pipeline, when enabled,
+    in a thread since decoding and resampling are CPU bound. A backend whose
+    model defines its own preprocessing gets the upload as it is.
+    """
+    if not settings.PREDICTION_PREPROCESS_AUDIO or getattr(
+        get_predictor(), "preprocesses_audio", False
+    ):
+        return filename, upload, content_type
+    return await asyncio.to_thread(
+        prepare_upload,
+        filename,
+        upload,
+        content_type,
+        settings.PREDICTION_SAMPLE_RATE,
+        settings.PREDICTION_AUDIO_FEATURES,
+    )
+
+
+def _prediction_cache_key(digest, label):
+    # the backend and the preprocessing change what the model answers as much
+    # as its version does
+    pipeline = repr(
+        (
+            settings.PREDICTION_BACKEND,
+            settings.PREDICTION_PREPROCESS_AUDIO,
+            settings.PREDICTION_AUDIO_FEATURES,
+            settings.PREDICTION_SAMPLE_RATE,
+        )
+    )
+    pipeline = hashlib.sha256(pipeline.encode()).hexdigest()[:16]
+    label = hashlib.sha256(label.encode()).hexdigest()
+    version = settings.AI_MODEL_VERSION
+    return f"anees:predict:{version}:{pipeline}:{digest}:{label}"
+
+
+@sync_to_async
+def _count(event):
+    # the sync incr and add are atomic, INCR and SET NX on Redis, where
+    # Django's aincr is a get followed by a set that loses concurrent counts
+    cache = caches["prediction_stats"]
+    key = PREDICTION_STATS_KEY.format(event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+async def get_cached_prediction(digest, label):
+    """
+    Return the cached ``(status, data)`` of an earlier prediction of the same
+    file and label by the current model version, or None.
+    """
+    cached = await caches["predictions"].aget(_prediction_cache_key(digest, label))
+    await _count("hits" if cached is not None else "misses")
+    return cached
+
+
+async def cache_prediction(digest, label, status_code, data):
+    if 200 <= status_code < 300:
+        await caches["predictions"].aset(
+            _prediction_cache_key(digest, label), (status_code, data)
+        )
+
+
+def prediction_cache_stats():
+    cache = caches["prediction_stats"]
+    hits = cache.get(PREDICTION_STATS_KEY.format("hits"), 0)
+    misses = cache.get(PREDICTION_STATS_KEY.format("misses"), 0)
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / lookups if lookups else 0,
+    }
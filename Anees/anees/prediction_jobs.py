@@ -0,0 +1,165 @@
+import asyncio
+import datetime
+import logging
+import mimetypes
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import PredictionJob
+from .prediction import (
+    ModelUnavailable,
+    cache_prediction,
+    get_cached_prediction,
+    get_predictor,
+    prepare_for_model,
+)
+
+logger = logging.getLogger(__name__)
+
+FINISHED = (PredictionJob.DONE, PredictionJob.FAILED)
+
+
+def claim_prediction_jobs(limit):
+    """
+    Take up to ``limit`` queued jobs, oldest first, and mark them running.
+    Rows locked by another worker are skipped, so any number of workers can
+    drain the queue side by side. A retried job is left alone until its
+    ``not_before``, and a running job whose worker went away is queued again
+    once it is older than ``PREDICTION_JOB_TIMEOUT``.
+    """
+    now = timezone.now()
+    stale = now - datetime.timedelta(seconds=settings.PREDICTION_JOB_TIMEOUT)
+    with transaction.atomic():
+        jobs = list(
+            PredictionJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=PredictionJob.PENDING)
+                & (Q(not_before__isnull=True) | Q(not_before__lte=now))
+                | Q(status=PredictionJob.RUNNING, started_at__lt=stale)
+            )
+            .order_by("created_at")[:limit]
+        )
+        if jobs:
+            PredictionJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=PredictionJob.RUNNING,
+                started_at=timezone.now(),
+                attempts=F("attempts") + 1,
+            )
+    for job in jobs:
+        job.attempts += 1
+    return jobs
+
+
+def finish_prediction_job(job: PredictionJob, status_code=None, result=None, error=""):
+    job.status = PredictionJob.FAILED if error else PredictionJob.DONE
+    job.status_code = status_code
+    job.result = result
+    job.error = error
+    job.finished_at = timezone.now()
+    name = job.file.name
+    job.file = None
+    job.save(
+        update_fields=[
+            "status",
+            "status_code",
+            "result",
+            "error",
+            "finished_at",
+            "file",
+        ]
+    )
+    # uploads are shared by identical jobs, so the file goes once the row no
+    # longer references it
+    if name:
+        job.file.storage.delete(name)
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt, doubled on every attempt."""
+    delay = settings.PREDICTION_JOB_RETRY_DELAY * 2 ** (attempts - 1)
+    return min(delay, settings.PREDICTION_JOB_MAX_RETRY_DELAY)
+
+
+def retry_prediction_job(job: PredictionJob, error):
+    if job.attempts >= settings.PREDICTION_JOB_MAX_ATTEMPTS:
+        finish_prediction_job(job, error=error)
+        return
+    # back off, so a model that is down isn't hammered by the whole queue
+    not_before = timezone.now() + datetime.timedelta(seconds=retry_delay(job.attempts))
+    PredictionJob.objects.filter(pk=job.pk).update(
+        status=PredictionJob.PENDING, error=error, not_before=not_before
+    )
+
+
+async def process_prediction_job(job: PredictionJob):
+    cached = await get_cached_prediction(job.digest, job.label)
+    if cached is not None:
+        await sync_to_async(finish_prediction_job)(job, *cached)
+        return
+    try:
+        upload = await sync_to_async(job.file.open)("rb")
+        try:
+            filename, payload, content_type = await prepare_for_model(
+                job.file.name, upload, mimetypes.guess_type(job.file.name)[0]
+            )
+            status_code, result = await get_predictor().predict(
+                job.label, filename, payload, content_type
+            )
+        finally:
+            upload.close()
+    except ModelUnavailable as error:
+        await sync_to_async(retry_prediction_job)(job, str(error))
+        return
+    except Exception as error:
+        logger.exception("Prediction job %s failed", job.pk)
+        await sync_to_async(finish_prediction_job)(job, error=str(error))
+        return
+    await cache_prediction(job.digest, job.label, status_code, result)
+    await sync_to_async(finish_prediction_job)(job, status_code, result)
+
+
+async def run_prediction_worker(concurrency, poll_interval, once=False):
+    """
+    Keep up to ``concurrency`` jobs in flight, claiming more whenever a slot
+    frees up. With ``once`` the worker stops when the queue is empty,
+    otherwise it polls the job table every ``poll_interval`` seconds.
+    """
+    running = set()
+    while True:
+        free = concurrency - len(running)
+        if free:
+            await sync_to_async(close_old_connections)()
+            jobs = await sync_to_async(claim_prediction_jobs)(free)
+            for job in jobs:
+                running.add(asyncio.create_task(process_prediction_job(job)))
+        if not running:
+            if once:
+                return
+            await asyncio.sleep(poll_interval)
+            continue
+        done, running = await asyncio.wait(
+            running, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in done:
+            if task.exception() is not None:
+                logger.error("Prediction worker task failed", exc_info=task.exception())
+
+
+async def wait_for_prediction_job(job_id, user, wait):
+    """
+    Fetch one of the user's jobs. While it is unfinished the job table is
+    polled for up to ``wait`` seconds, so clients can long-poll for the result.
+    """
+    jobs = PredictionJob.objects.filter(pk=job_id, user=user)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        job = await sync_to_async(jobs.first)()
+        remaining = deadline - loop.time()
+        if job is None or job.status in FINISHED or remaining <= 0:
+            return job
+        await asyncio.sleep(min(settings.PREDICTION_JOB_POLL_INTERVAL, remaining))
@@ -0,0 +1,105 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Now
+
+from .models import Child, ChildProgressSummary
+
+SUMMARY_FIELDS = [
+    "current_level",
+    "completed_levels",
+    "receptive_accuracy",
+    "expressive_accuracy",
+    "social_accuracy",
+]
+
+
+def refresh_progress(*child_ids):
+    """
+    Recompute the progress summary rows of the given children from their
+    ChildLevel history. Costs one locking query, one grouped query and one
+    upsert no matter how many children are passed, and runs inside the
+    caller's transaction.
+    """
+    if not child_ids:
+        return []
+    with transaction.atomic(savepoint=False):
+        # Locking the rows first makes a concurrent record_progress wait, or
+        # the history read below include its submission; either way the
+        # upsert can't write over its increment with older totals.
+        list(
+            ChildProgressSummary.objects.select_for_update()
+            .filter(pk__in=child_ids)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        rows = (
+            Child.objects.filter(pk__in=child_ids)
+            .with_progress()
+            .order_by()
+            .values("pk", *SUMMARY_FIELDS)
+        )
+        summaries = [
+            ChildProgressSummary(
+                child_id=row["pk"],
+                current_level=row["current_level"],
+                completed_levels=row["completed_levels"],
+                receptive_accuracy=row["receptive_accuracy"] or 0,
+                expressive_accuracy=row["expressive_accuracy"] or 0,
+                social_accuracy=row["social_accuracy"] or 0,
+            )
+            for row in rows
+        ]
+        return ChildProgressSummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=["child"],
+            update_fields=SUMMARY_FIELDS + ["updated_at"],
+        )
+
+
+def record_progress(child_id, completed_scores=(), score_gains=None, unlocked=0):
+    """
+    Fold a score submission into the child's summary row with one UPDATE
+    instead of re-aggregating the whole history.
+
+    ``completed_scores`` holds the per-game scores of levels that have just
+    been completed, ``score_gains`` the per-game score increase of a level
+    that was already complete, and ``unlocked`` the number of new levels.
+    """
+    score_gains = score_gains or {}
+    added = len(completed_scores)
+    updates = {}
+    if unlocked:
+        updates["current_level"] = F("current_level") + unlocked
+    if added or any(score_gains.values()):
+        completed = F("completed_levels") + added
+        for game in ("receptive", "expressive", "social"):
+            gained = sum(scores[game] for scores in completed_scores)
+            gained += score_gains.get(game, 0)
+            if gained or added:
+                accuracy = f"{game}_accuracy"
+                updates[accuracy] = (
+                    F(accuracy) * F("completed_levels") + gained
+                ) / completed
+        if added:
+            updates["completed_levels"] = completed
+    if not updates:
+        return
+    updated = ChildProgressSummary.objects.filter(pk=child_id).update(
+        updated_at=Now(), **updates
+    )
+    if not updated:
+        refresh_progress(child_id)
+
+
+def get_progress(child: Child):
+    """
+    Return the child's summary row, building it on the fly for children that
+    predate the summary table.
+    """
+    try:
+        return child.progress
+    except ChildProgressSummary.DoesNotExist:
+        summary = refresh_progress(child.pk)[0]
+        child.progress = summary
+        return summary
@@ -0,0 +1,224 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Greatest, Now
+from django.utils import timezone
+
+from .models import ChildLevel, Level
+from .progress import record_progress, refresh_progress
+from .words import invalidate_learned_words
+
+GAMES = tuple(Level.GAME_FLAGS)
+WORD_GAMES = ("receptive", "expressive")
+
+
+class Submission:
+    """Outcome of applying one game score to a child's progress."""
+
+    def __init__(self):
+        self.level_found = False
+        self.game_found = False
+        self.new_high_score = False
+        self.completed = False
+        self.unlocked = False
+        self.finished = False
+
+
+def new_child_level(child_id, level_id, games):
+    """
+    Build a ChildLevel for a freshly unlocked level from the level's games
+    bitmask. Games the level does not have are marked complete with full
+    marks, as the update_level signal does for rows created one at a time.
+    """
+    child_level = ChildLevel(child_id=child_id, level_id=level_id)
+    for game, flag in Level.GAME_FLAGS.items():
+        if not games & flag:
+            setattr(child_level, f"{game}_complete", True)
+            setattr(child_level, f"{game}_score", 100)
+    return child_level
+
+
+def game_scores(child_level: ChildLevel):
+    return {game: getattr(child_level, f"{game}_score") for game in GAMES}
+
+
+def apply_score(child_level: ChildLevel, game, score):
+    """Apply a score to the in-memory row and tell whether it beat the old one."""
+    old_score = getattr(child_level, f"{game}_score")
+    setattr(child_level, f"{game}_complete", True)
+    setattr(child_level, f"{game}_score", max(score, old_score))
+    return score > old_score
+
+
+def submit_score(child_id, level_num, game, score):
+    """
+    Record a game score and unlock the next level when this completes the
+    current one.
+
+    The child's row is locked for the duration of the transaction, and the
+    score only ever grows through ``GREATEST``, so two games finishing at the
+    same time cannot overwrite each other. Whether the next level is already
+    unlocked is only asked once the lock is held: a subquery on the locking
+    statement would still see the snapshot taken before it waited, and a
+    retried submission would unlock the same level twice.
+    """
+    submission = Submission()
+    next_num = OuterRef("level__level_num") + 1
+    with transaction.atomic():
+        level = (
+            ChildLevel.objects.select_for_update(of=("self",))
+            .select_related("level")
+            .filter(child_id=child_id, level__level_num=level_num)
+            .annotate(
+                next_level_id=Subquery(
+                    Level.objects.filter(level_num=next_num).values("pk")[:1]
+                ),
+                next_level_games=Subquery(
+                    Level.objects.filter(level_num=next_num).values("games")[:1]
+                ),
+            )
+            .first()
+        )
+        if level is None:
+            return submission
+        submission.level_found = True
+        if not level.level.has_game(game):
+            return submission
+        submission.game_found = True
+
+        was_completed = level.completed
+        was_game_completed = getattr(level, f"{game}_complete")
+        old_score = getattr(level, f"{game}_score")
+        submission.new_high_score = apply_score(level, game, score)
+        submission.completed = level.completed
+
+        updates = {
+            f"{game}_complete": True,
+            f"{game}_score": Greatest(F(f"{game}_score"), Value(score)),
+            "updated_at": Now(),
+        }
+        if level.completed and level.completed_date is None:
+            updates["completed_date"] = datetime.date.today()
+        ChildLevel.objects.filter(pk=level.pk).update(**updates)
+
+        completed_scores = []
+        score_gains = {}
+        if level.completed and not was_completed:
+            completed_scores.append(game_scores(level))
+        elif was_completed and submission.new_high_score:
+            score_gains[game] = score - old_score
+
+        if level.completed:
+            if level.next_level_id is None:
+                submission.finished = True
+            elif not ChildLevel.objects.filter(
+                child_id=child_id, level_id=level.next_level_id
+            ).exists():
+                next_level = new_child_level(
+                    child_id, level.next_level_id, level.next_level_games
+                )
+                ChildLevel.objects.bulk_create([next_level], ignore_conflicts=True)
+                submission.unlocked = True
+                if next_level.completed:
+                    completed_scores.append(game_scores(next_level))
+
+        record_progress(
+            child_id,
+            completed_scores=completed_scores,
+            score_gains=score_gains,
+            unlocked=int(submission.unlocked),
+        )
+        if game in WORD_GAMES and not was_game_completed:
+            invalidate_learned_words(child_id)
+    return submission
+
+
+def submit_scores(child_id, results):
+    """
+    Apply a batch of offline game results in level order inside one
+    transaction, so a result can rely on a level unlocked by an earlier one.
+
+    ``results`` is a list of ``{"level", "game", "score"}`` dicts. Returns the
+    outcome of every result, in the order given, and the numbers of the
+    levels that were unlocked.
+    """
+    outcomes = [None] * len(results)
+    unlocked = []
+    if not results:
+        return outcomes, unlocked
+    level_nums = [result["level"] for result in results]
+    low, high = min(level_nums), max(level_nums) + 1
+    with transaction.atomic():
+        child_levels = {
+            child_level.level.level_num: child_level
+            for child_level in ChildLevel.objects.select_for_update(of=("self",))
+            .select_related("level")
+            .filter(child_id=child_id, level__level_num__range=(low, high))
+        }
+        levels = {
+            level.level_num: level
+            for level in Level.objects.filter(level_num__range=(low, high))
+        }
+
+        changed = {}
+        created = []
+        word_games_completed = False
+        order = sorted(range(len(results)), key=lambda index: results[index]["level"])
+        for index in order:
+            level_num, game = results[index]["level"], results[index]["game"]
+            outcome = {"level": level_num, "game": game}
+            outcomes[index] = outcome
+            child_level = child_levels.get(level_num)
+            if child_level is None:
+                outcome["status"] = "locked"
+                continue
+            if not levels[level_num].has_game(game):
+                outcome["status"] = "missing_game"
+                continue
+
+            if game in WORD_GAMES and not getattr(child_level, f"{game}_complete"):
+                word_games_completed = True
+            was_completed = child_level.completed
+            outcome["status"] = "recorded"
+            outcome["new_high_score"] = apply_score(
+                child_level, game, results[index]["score"]
+            )
+            outcome["completed"] = child_level.completed
+            if child_level.pk:
+                changed[child_level.pk] = child_level
+            if child_level.completed and child_level.completed_date is None:
+                child_level.completed_date = datetime.date.today()
+            if not child_level.completed or was_completed:
+                continue
+
+            next_level = levels.get(level_num + 1)
+            if next_level is not None and level_num + 1 not in child_levels:
+                new_level = new_child_level(child_id, next_level.pk, next_level.games)
+                new_level.level = next_level
+                child_levels[level_num + 1] = new_level
+                created.append(new_level)
+                unlocked.append(level_num + 1)
+
+        now = timezone.now()
+        for child_level in changed.values():
+            child_level.updated_at = now
+        ChildLevel.objects.bulk_update(
+            changed.values(),
+            [
+                "receptive_complete",
+                "expressive_complete",
+                "social_complete",
+                "receptive_score",
+                "expressive_score",
+                "social_score",
+                "completed_date",
+                "updated_at",
+            ],
+        )
+        ChildLevel.objects.bulk_create(created, ignore_conflicts=True)
+        if changed or created:
+            refresh_progress(child_id)
+        if word_games_completed:
+            invalidate_learned_words(child_id)
+    return outcomes, unlocked
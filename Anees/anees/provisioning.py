@@ -0,0 +1,113 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Child, ChildLevel, Level, LevelProvisioningJob
+from .progress import refresh_progress
+from .progression import new_child_level
+
+logger = logging.getLogger(__name__)
+
+
+def eligible_children(level: Level, after=None):
+    """Ids of the children who should get the level, in primary key order."""
+    if level.level_num == 1:
+        field = "pk"
+        children = Child.objects.all()
+    else:
+        field = "child_id"
+        children = ChildLevel.objects.filter(
+            level__level_num=level.level_num - 1,
+            receptive_complete=True,
+            expressive_complete=True,
+            social_complete=True,
+        )
+    if after is not None:
+        children = children.filter(**{f"{field}__gt": after})
+    return children.order_by(field).values_list(field, flat=True)
+
+
+def provision_children(level: Level, child_ids, games):
+    ChildLevel.objects.bulk_create(
+        [new_child_level(child_id, level.pk, games) for child_id in child_ids],
+        ignore_conflicts=True,
+    )
+    refresh_progress(*child_ids)
+
+
+def provision_level(level: Level):
+    """
+    Give a newly created level to every eligible child once the transaction
+    that created it commits, since the admin saves the level's games after
+    the level itself.
+    """
+    transaction.on_commit(lambda: provision_saved_level(level.pk))
+
+
+def provision_saved_level(level_id):
+    """
+    Small runs happen right away with one bulk insert, larger ones are queued
+    as a job for the run_provisioning_jobs worker so the admin request
+    returns right away.
+    """
+    level = Level.objects.filter(pk=level_id).first()
+    if level is None:
+        return None
+    children = eligible_children(level)
+    total = children.count()
+    if not total:
+        return None
+    if total <= settings.LEVEL_PROVISIONING_SYNC_LIMIT:
+        with transaction.atomic():
+            provision_children(level, list(children), level.games)
+        return None
+    return LevelProvisioningJob.objects.create(level=level, total=total)
+
+
+def provision_next_batch(job_id, batch_size):
+    """
+    Provision the children after the last one the job stored. The job row is
+    locked for the batch, so runners that pick up the same job take turns
+    and never store or count a child twice.
+    """
+    with transaction.atomic():
+        job = (
+            LevelProvisioningJob.objects.select_for_update(of=("self",))
+            .select_related("level")
+            .get(pk=job_id)
+        )
+        batch = list(eligible_children(job.level, after=job.last_child_id)[:batch_size])
+        if not batch:
+            return False
+        provision_children(job.level, batch, job.level.games)
+        job.processed += len(batch)
+        job.last_child_id = batch[-1]
+        job.save(update_fields=["processed", "last_child_id", "updated_at"])
+    return True
+
+
+def run_provisioning_job(job_id):
+    """
+    Provision a job's children in batches, committing progress after each
+    one. A job interrupted part way resumes after the last child it stored.
+    """
+    try:
+        jobs = LevelProvisioningJob.objects.filter(pk=job_id).exclude(
+            status=LevelProvisioningJob.DONE
+        )
+        if not jobs.update(
+            status=LevelProvisioningJob.RUNNING, updated_at=timezone.now()
+        ):
+            return
+        while provision_next_batch(job_id, settings.LEVEL_PROVISIONING_BATCH_SIZE):
+            pass
+        LevelProvisioningJob.objects.filter(pk=job_id).update(
+            status=LevelProvisioningJob.DONE, updated_at=timezone.now()
+        )
+    except Exception as error:
+        logger.exception("Provisioning job %s failed", job_id)
+        LevelProvisioningJob.objects.filter(pk=job_id).update(
+            status=LevelProvisioningJob.FAILED, error=str(error)
+        )
@@ -0,0 +1,73 @@
+import base64
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.encoding import filepath_to_uri
+
+from .storage import ContentAddressedMixin, is_content_addressed
+
+try:
+    from storages.backends.s3boto3 import S3Boto3Storage
+    from storages.utils import clean_name
+except ImportError as error:
+    raise ImproperlyConfigured(
+        "django-storages and boto3 must be installed to store media on S3"
+    ) from error
+
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+class ContentAddressedS3Storage(ContentAddressedMixin, S3Boto3Storage):
+    """
+    Content-addressed media in an S3 compatible bucket (AWS, MinIO...), so
+    the web processes need no shared volume. File bytes bypass Django both
+    ways: the media view redirects to presigned GET URLs once it has checked
+    access, and clients upload straight to the bucket with presigned PUTs.
+    """
+
+    direct_transfers = True
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        # Rows link to the media view, which checks access before redirecting
+        # to the bucket. Serialized game content is cached for days, longer
+        # than a presigned URL lives.
+        return urljoin(settings.MEDIA_URL, filepath_to_uri(name))
+
+    def presigned_url(self, name, expire=None, attachment=False):
+        parameters = (
+            {"ResponseContentDisposition": "attachment"} if attachment else None
+        )
+        return super().url(name, parameters=parameters, expire=expire)
+
+    def get_object_parameters(self, name):
+        parameters = super().get_object_parameters(name)
+        if is_content_addressed(name):
+            parameters.setdefault("CacheControl", IMMUTABLE)
+        return parameters
+
+    def presigned_upload(self, name, digest, content_type, expire=None):
+        """
+        A presigned PUT storing ``name``. The checksum header is part of the
+        signature, so the bucket refuses any content not hashing to
+        ``digest`` and the name stays content addressed. Returns the URL and
+        the headers the client has to send.
+        """
+        headers = {
+            "Content-Type": content_type,
+            "Cache-Control": IMMUTABLE,
+            "x-amz-checksum-sha256": base64.b64encode(bytes.fromhex(digest)).decode(),
+        }
+        url = self.bucket.meta.client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket_name,
+                "Key": self._normalize_name(clean_name(name)),
+                "ContentType": headers["Content-Type"],
+                "CacheControl": headers["Cache-Control"],
+                "ChecksumSHA256": headers["x-amz-checksum-sha256"],
+            },
+            ExpiresIn=expire or self.querystring_expire,
+            HttpMethod="PUT",
+        )
+        return url, headers
@@ -1,12 +1,69 @@
 from rest_framework.reverse import reverse
 from rest_framework import serializers
 from . import models
+from .media import (
+    UPLOAD_TARGETS,
+    is_valid_upload,
+    upload_content_type,
+    upload_max_size,
+    upload_target,
+)
+from .storage import is_stored_upload
+from .progress import get_progress
 from core.serializers import UserCreateSerializer
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.utils import timezone
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    URLs of an image's resized copies as ``{size: {format: url}}``, empty
+    until they have been generated.
+    """
+
+    def to_representation(self, variants):
+        request = self.context.get("request")
+        urls = {}
+        for size, names in variants.items():
+            if size == "source":
+                continue
+            urls[size] = {}
+            for extension, name in names.items():
+                url = default_storage.url(name)
+                urls[size][extension] = (
+                    request.build_absolute_uri(url) if request else url
+                )
+        return urls
+
+
+class UploadedFileField(serializers.CharField):
+    """
+    Name of a file uploaded straight to storage with a presigned upload, to
+    set a file field without sending the file through the API.
+    """
+
+    def to_internal_value(self, data):
+        name = super().to_internal_value(data)
+        field = self.parent.Meta.model._meta.get_field(self.source)
+        target = upload_target(field.model, field.name)
+        if upload_content_type(target, name) is None or not is_stored_upload(
+            name, field.upload_to
+        ):
+            raise serializers.ValidationError("No file was uploaded under this name.")
+        # the bytes went straight to the bucket, so they are checked here like
+        # the field's own validation would check a file sent to the API
+        if default_storage.size(name) > upload_max_size(target):
+            raise serializers.ValidationError("The File Is Too Large")
+        with default_storage.open(name) as file:
+            if not is_valid_upload(target, file):
+                raise serializers.ValidationError("The File Is Not A Valid Image")
+        return name
+
+
 class ChildSerializer(serializers.ModelSerializer):
     user_info = UserCreateSerializer(source="user", read_only=True)
+    picture_variants = ImageVariantsField()
     accuracy = serializers.SerializerMethodField(read_only=True)
     current_level = serializers.SerializerMethodField(read_only=True)
     join_duration_in_days = serializers.SerializerMethodField(read_only=True)
@@ -16,6 +73,7 @@ class ChildSerializer(serializers.ModelSerializer):
         model = models.Child
         fields = [
             "picture",
+            "picture_variants",
             "current_level",
             "join_duration_in_days",
             "accuracy",
@@ -23,41 +81,30 @@ class ChildSerializer(serializers.ModelSerializer):
             "user_info",
         ]
 
+    def get_progress(self, child: models.Child):
+        # Annotations from Child.objects.with_progress() win over the stored
+        # summary so that callers can ask for freshly aggregated numbers.
+        if hasattr(child, "receptive_accuracy"):
+            return child
+        return get_progress(child)
+
     def get_current_level(self, child: models.Child):
-        return child.levels.all().count()
+        return self.get_progress(child).current_level
 
     def get_join_duration_in_days(self, child: models.Child):
+        if hasattr(child, "join_duration"):
+            # NOW() is the transaction start time, which can precede a child
+            # created in the same transaction.
+            return max(child.join_duration.days, 0)
         now = timezone.now()
         return (now - child.date_joined).days
 
     def get_accuracy(self, child: models.Child):
-        levels = child.levels.all().select_related("level")
-        receptive_score = 0
-        expressive_score = 0
-        social_score = 0
-        receptive_count = 0
-        expressive_count = 0
-        social_count = 0
-        for level in levels:
-            if level.completed:
-                receptive_score += level.receptive_score
-                receptive_count += 1
-                expressive_score += level.expressive_score
-                expressive_count += 1
-                social_score += level.social_score
-                social_count += 1
-        receptive_score = (
-            0 if receptive_count == 0 else receptive_score / receptive_count
-        )
-        expressive_score = (
-            0 if expressive_count == 0 else expressive_score / expressive_count
-        )
-        social_score = 0 if social_count == 0 else social_score / social_count
-
+        progress = self.get_progress(child)
         return {
-            "receptive": receptive_score,
-            "expressive": expressive_score,
-            "social": social_score,
+            "receptive": progress.receptive_accuracy or 0,
+            "expressive": progress.expressive_accuracy or 0,
+            "social": progress.social_accuracy or 0,
         }
 
     def get_words(self, child: models.Child):
@@ -65,9 +112,11 @@ class ChildSerializer(serializers.ModelSerializer):
 
 
 class ChildUpdateSerializer(serializers.ModelSerializer):
+    picture_name = UploadedFileField(source="picture", write_only=True, required=False)
+
     class Meta:
         model = models.Child
-        fields = ["picture"]
+        fields = ["picture", "picture_name"]
 
 
 class LevelSerializer(serializers.ModelSerializer):
@@ -114,41 +163,23 @@ class LevelDetailSerializer(serializers.ModelSerializer):
             "score",
         ]
 
-    def get_receptive(self, childlevel: models.ChildLevel):
-        request = self.context.get("request")
-        try:
-            if childlevel.level.receptive:
-                return reverse(
-                    "receptive",
-                    kwargs={"pk": childlevel.level.level_num},
-                    request=request,
-                )
-        except Exception as e:
+    def get_game_url(self, childlevel: models.ChildLevel, game):
+        if not childlevel.level.has_game(game):
             return None
+        return reverse(
+            game,
+            kwargs={"pk": childlevel.level.level_num},
+            request=self.context.get("request"),
+        )
+
+    def get_receptive(self, childlevel: models.ChildLevel):
+        return self.get_game_url(childlevel, "receptive")
 
     def get_expressive(self, childlevel: models.ChildLevel):
-        request = self.context.get("request")
-        try:
-            if childlevel.level.expressive:
-                return reverse(
-                    "expressive",
-                    kwargs={"pk": childlevel.level.level_num},
-                    request=request,
-                )
-        except Exception as e:
-            return None
+        return self.get_game_url(childlevel, "expressive")
 
     def get_social(self, childlevel: models.ChildLevel):
-        request = self.context.get("request")
-        try:
-            if childlevel.level.social:
-                return reverse(
-                    "social",
-                    kwargs={"pk": childlevel.level.level_num},
-                    request=request,
-                )
-        except:
-            return None
+        return self.get_game_url(childlevel, "social")
 
     def get_level_num(self, level: models.ChildLevel):
         return level.level.level_num
@@ -163,9 +194,11 @@ class LevelDetailSerializer(serializers.ModelSerializer):
 
 
 class ReceptiveImageSerializer(serializers.ModelSerializer):
+    img_variants = ImageVariantsField()
+
     class Meta:
         model = models.ReceptiveImage
-        fields = ["id", "img", "name"]
+        fields = ["id", "img", "img_variants", "name"]
 
 
 class ReceptiveSerializer(serializers.ModelSerializer):
@@ -179,17 +212,11 @@ class ReceptiveSerializer(serializers.ModelSerializer):
 
 
 class ExpressiveSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = models.Expressive
-        fields = ["id", "img", "answer"]
-
-
-class SimpleExpressiveSerializer(serializers.ModelSerializer):
-    score = serializers.IntegerField(write_only=True)
+    img_variants = ImageVariantsField()
 
     class Meta:
         model = models.Expressive
-        fields = ["score"]
+        fields = ["id", "img", "img_variants", "answer"]
 
 
 class SocialMessageSerializer(serializers.ModelSerializer):
@@ -207,9 +234,108 @@ class SocialSerializer(serializers.ModelSerializer):
         fields = ["id", "video", "messages", "score"]
 
 
-class SimpleSocialSerializer(serializers.ModelSerializer):
-    score = serializers.IntegerField(write_only=True)
+class LevelPackSerializer(serializers.ModelSerializer):
+    level_num = serializers.IntegerField(source="level.level_num")
+    url = serializers.FileField(source="file")
+    stale = serializers.BooleanField(read_only=True)
 
     class Meta:
-        model = models.Social
-        fields = ["score"]
+        model = models.LevelPack
+        fields = ["level_num", "url", "digest", "size", "content_version", "stale"]
+
+
+def validate_upload_type(data):
+    """Replace the declared content type by the one the filename maps to."""
+    content_type = upload_content_type(
+        data["target"], data["filename"], data["content_type"]
+    )
+    if content_type is None:
+        raise serializers.ValidationError(
+            {"filename": "This Type Of File Can't Be Uploaded Here"}
+        )
+    data["content_type"] = content_type
+    return data
+
+
+class DirectUploadSerializer(serializers.Serializer):
+    target = serializers.ChoiceField(choices=list(UPLOAD_TARGETS))
+    digest = serializers.RegexField(r"^[0-9a-f]{64}$")
+    filename = serializers.CharField(max_length=255)
+    content_type = serializers.CharField(max_length=255)
+
+    def validate(self, data):
+        return validate_upload_type(data)
+
+
+class ChunkedUploadStartSerializer(serializers.Serializer):
+    target = serializers.ChoiceField(choices=list(UPLOAD_TARGETS))
+    filename = serializers.CharField(max_length=255)
+    content_type = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+
+    def validate(self, data):
+        data = validate_upload_type(data)
+        if data["size"] > upload_max_size(data["target"]):
+            raise serializers.ValidationError({"size": "The File Is Too Large"})
+        return data
+
+
+class ChunkedUploadCompleteSerializer(serializers.Serializer):
+    digest = serializers.RegexField(r"^[0-9a-f]{64}$", required=False)
+
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+    status = serializers.CharField(source="get_status_display")
+
+    class Meta:
+        model = models.ChunkedUpload
+        fields = [
+            "id",
+            "url",
+            "target",
+            "filename",
+            "size",
+            "offset",
+            "status",
+            "name",
+            "created_at",
+        ]
+
+    def get_url(self, upload):
+        return reverse(
+            "chunked-upload",
+            kwargs={"pk": upload.pk},
+            request=self.context.get("request"),
+        )
+
+
+class GameScoreSerializer(serializers.Serializer):
+    score = serializers.IntegerField()
+
+
+class GameResultSerializer(serializers.Serializer):
+    level = serializers.IntegerField(min_value=1)
+    game = serializers.ChoiceField(choices=["receptive", "expressive", "social"])
+    score = serializers.IntegerField()
+
+
+class ScoreSyncSerializer(serializers.Serializer):
+    results = GameResultSerializer(many=True, allow_empty=False, max_length=500)
+
+
+class PredictionJobSerializer(serializers.ModelSerializer):
+    status = serializers.CharField(source="get_status_display")
+
+    class Meta:
+        model = models.PredictionJob
+        fields = [
+            "id",
+            "label",
+            "status",
+            "status_code",
+            "result",
+            "error",
+            "created_at",
+            "finished_at",
+        ]
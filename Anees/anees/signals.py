@@ -1,8 +1,24 @@
-from django.db.models.signals import post_save
+from functools import partial
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.contrib.auth import get_user_model
 from django.dispatch import receiver
-from .models import Child, ChildLevel, Level
-from django.db.models import Q
+from .availability import has_game, update_level_games
+from .content import bump_content_version
+from .models import (
+    Child,
+    ChildLevel,
+    Expressive,
+    Level,
+    Receptive,
+    ReceptiveImage,
+    Social,
+    conversionMessage,
+)
+from .progress import refresh_progress
+from .provisioning import provision_level
+from .words import invalidate_all_learned_words
 
 User = get_user_model()
 
@@ -20,66 +36,91 @@ def Create_ChildLevel(sender, instance, created, **kwargs):
             ChildLevel.objects.create(
                 child=instance, level=Level.objects.get(level_num=1)
             )
+        refresh_progress(instance.pk)
 
 
 @receiver(post_save, sender=Level)
 def assign_user_new_level(sender, instance, created, **kwargs):
     if created:
-        children = []
-        if instance.level_num == 1:
-            children = Child.objects.all()
-
-            if children:
-                for child in children:
-                    ChildLevel.objects.create(child=child, level=instance)
-                # ChildLevel.objects.bulk_create(
-                #     [ChildLevel(child=child, level=instance) for child in children]
-                # )
-        else:
-            children = (
-                ChildLevel.objects.select_related("child")
-                .filter(
-                    level__level_num=instance.level_num - 1,
-                    receptive_complete=True,
-                    expressive_complete=True,
-                    social_complete=True,
-                )
-                .values_list("child", flat=True)
-            )
-            if children:
-                for child_id in children:
-                    ChildLevel.objects.create(child_id=child_id, level=instance)
-                # ChildLevel.objects.bulk_create(
-                #     [
-                #         ChildLevel(child_id=child_id, level=instance)
-                #         for child_id in children
-                #     ]
-                # )
+        provision_level(instance)
+
+
+def deleted_with(origin, *models):
+    """Whether a delete() called on ``origin``, a row or a queryset, was of ``models``."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, models)
+
+
+@receiver(pre_delete, sender=Level)
+def collect_level_children(sender, instance, **kwargs):
+    instance.deleted_child_ids = list(
+        ChildLevel.objects.filter(level=instance).values_list("child_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Level)
+def refresh_level_children_progress(sender, instance, **kwargs):
+    # one refresh for all the level's children, instead of one per ChildLevel
+    transaction.on_commit(partial(refresh_progress, *instance.deleted_child_ids))
+
+
+@receiver(post_delete, sender=ChildLevel)
+def refresh_deleted_child_level_progress(sender, instance, origin=None, **kwargs):
+    # a deleted child takes its summary along, and a deleted level refreshes
+    # its children itself
+    if deleted_with(origin, Child, User, Level):
+        return
+    transaction.on_commit(partial(refresh_progress, instance.child_id))
 
 
 @receiver(post_save, sender=ChildLevel)
 def update_level(sender, instance, created, **kwargs):
     if created:
-        level = instance.level
-        try:
-            if level.receptive:
-                pass
-        except:
-            instance.receptive_complete = True
-            instance.receptive_score = 100
-
-        try:
-            if level.expressive:
-                pass
-        except:
-            instance.expressive_complete = True
-            instance.expressive_score = 100
-
-        try:
-            if level.social:
-                pass
-        except:
-            instance.social_complete = True
-            instance.social_score = 100
-
-        instance.save()
+        missing = [
+            game for game in Level.GAME_FLAGS if not has_game(instance.level_id, game)
+        ]
+        for game in missing:
+            setattr(instance, f"{game}_complete", True)
+            setattr(instance, f"{game}_score", 100)
+        if missing:
+            instance.save()
+
+
+@receiver(post_save, sender=Receptive)
+@receiver(post_delete, sender=Receptive)
+@receiver(post_save, sender=Expressive)
+@receiver(post_delete, sender=Expressive)
+def invalidate_words(sender, instance, **kwargs):
+    invalidate_all_learned_words()
+
+
+@receiver(post_save, sender=Receptive)
+@receiver(post_delete, sender=Receptive)
+@receiver(post_save, sender=Expressive)
+@receiver(post_delete, sender=Expressive)
+@receiver(post_save, sender=Social)
+@receiver(post_delete, sender=Social)
+def update_game_content_version(sender, instance, **kwargs):
+    bump_content_version(pk=instance.level_id)
+
+
+@receiver(post_save, sender=Receptive)
+@receiver(post_delete, sender=Receptive)
+@receiver(post_save, sender=Expressive)
+@receiver(post_delete, sender=Expressive)
+@receiver(post_save, sender=Social)
+@receiver(post_delete, sender=Social)
+def update_game_availability(sender, instance, **kwargs):
+    update_level_games(pk=instance.level_id)
+
+
+@receiver(post_save, sender=ReceptiveImage)
+@receiver(post_delete, sender=ReceptiveImage)
+def update_receptive_image_content_version(sender, instance, **kwargs):
+    bump_content_version(receptive__pk=instance.receptive_id)
+
+
+@receiver(post_save, sender=conversionMessage)
+@receiver(post_delete, sender=conversionMessage)
+def update_social_message_content_version(sender, instance, **kwargs):
+    bump_content_version(social__pk=instance.social_id)
@@ -0,0 +1,109 @@
+// Sends files picked in a ChunkedFileInput through the resumable upload API
+// (anees.views.ChunkedUploadListApiView), so a large video never has to fit
+// in a single request. A failed chunk is retried from the offset the server
+// has, and the form only submits the name of the stored file.
+"use strict";
+{
+    const RETRIES = 5;
+
+    function csrfToken() {
+        const input = document.querySelector("[name=csrfmiddlewaretoken]");
+        return input ? input.value : "";
+    }
+
+    async function request(method, url, body, headers) {
+        const response = await fetch(url, {
+            method: method,
+            body: body,
+            credentials: "same-origin",
+            headers: Object.assign({"X-CSRFToken": csrfToken()}, headers),
+        });
+        const data = await response.json().catch(() => ({}));
+        if (!response.ok) {
+            const error = new Error(data.error || response.statusText);
+            error.status = response.status;
+            error.offset = data.offset;
+            throw error;
+        }
+        return data;
+    }
+
+    async function checksum(blob) {
+        if (!window.crypto || !window.crypto.subtle) {
+            return {};
+        }
+        const digest = await crypto.subtle.digest("SHA-256", await blob.arrayBuffer());
+        const base64 = btoa(String.fromCharCode(...new Uint8Array(digest)));
+        return {"Upload-Checksum": "sha256 " + base64};
+    }
+
+    async function sendChunks(upload, file, chunkSize, progress) {
+        let offset = upload.offset;
+        let failures = 0;
+        while (offset < file.size) {
+            const chunk = file.slice(offset, offset + chunkSize);
+            try {
+                const headers = Object.assign(
+                    {
+                        "Content-Type": "application/offset+octet-stream",
+                        "Upload-Offset": String(offset),
+                    },
+                    await checksum(chunk)
+                );
+                offset = (await request("PATCH", upload.url, chunk, headers)).offset;
+                failures = 0;
+            } catch (error) {
+                if (++failures > RETRIES || error.status === 403 || error.status === 404) {
+                    throw error;
+                }
+                await new Promise((resolve) => setTimeout(resolve, 1000 * failures));
+                // resume from what the server actually stored
+                offset = (await request("GET", upload.url)).offset;
+            }
+            progress.value = Math.floor((100 * offset) / file.size);
+        }
+    }
+
+    async function uploadFile(fileInput, hidden) {
+        const file = fileInput.files[0];
+        const progress = hidden.nextElementSibling;
+        const form = fileInput.form;
+        const buttons = form.querySelectorAll("[type=submit]");
+        buttons.forEach((button) => button.disabled = true);
+        progress.hidden = false;
+        progress.value = 0;
+        hidden.value = "";
+        try {
+            const data = new FormData();
+            data.append("target", hidden.dataset.target);
+            data.append("filename", file.name);
+            data.append("content_type", file.type || "application/octet-stream");
+            data.append("size", file.size);
+            const upload = await request("POST", hidden.dataset.chunkedUpload, data);
+            await sendChunks(upload, file, Number(hidden.dataset.chunkSize), progress);
+            const stored = await request("POST", upload.url + "complete/");
+            hidden.value = stored.name;
+            // the file itself must not be submitted with the form again
+            fileInput.value = "";
+            progress.value = 100;
+        } catch (error) {
+            progress.hidden = true;
+            window.alert("The upload of " + file.name + " failed: " + error.message);
+        } finally {
+            buttons.forEach((button) => button.disabled = false);
+        }
+    }
+
+    document.addEventListener("change", (event) => {
+        const input = event.target;
+        if (input.type !== "file" || !input.files.length) {
+            return;
+        }
+        const hidden = document.querySelector(
+            `input[name="${input.name}_uploaded"][data-chunked-upload]`
+        );
+        if (hidden) {
+            uploadFile(input, hidden);
+        }
+    });
+}
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import models
+
+DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+def blob_digest(name):
+    """The sha256 a stored name is addressed by, or None for plain names."""
+    digest = posixpath.basename(name).split(".")[0]
+    return digest if DIGEST.fullmatch(digest) else None
+
+
+def is_content_addressed(name):
+    """Whether ``name`` is ``<sha256>.<ext>``, whose content can never change."""
+    return bool(blob_digest(name)) and posixpath.basename(name).count(".") <= 1
+
+
+def is_derived(name):
+    """Whether ``name`` is derived from a blob, like ``<sha256>.thumbnail.webp``."""
+    return bool(blob_digest(name)) and posixpath.basename(name).count(".") > 1
+
+
+def file_fields(directory=None):
+    """Every ``(model, FileField)`` of the project that can store under ``directory``."""
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if not isinstance(field, models.FileField):
+                continue
+            if (
+                directory is not None
+                and isinstance(field.upload_to, str)
+                and field.upload_to.strip("/") != directory
+            ):
+                continue
+            yield model, field
+
+
+def is_referenced(name):
+    """
+    Whether a row still points at the stored file ``name``. A blob and the
+    files derived from it are referenced by every row holding the blob.
+    """
+    directory = posixpath.dirname(name)
+    digest = blob_digest(name)
+    if digest:
+        lookup, value = "startswith", f"{directory}/{digest}."
+    else:
+        lookup, value = "exact", name
+    return any(
+        model._default_manager.filter(**{f"{field.name}__{lookup}": value}).exists()
+        for model, field in file_fields(directory)
+    )
+
+
+def is_stored_upload(name, upload_to):
+    """Whether ``name`` is a stored blob a field saving to ``upload_to`` can take."""
+    return (
+        posixpath.dirname(name) == upload_to
+        and is_content_addressed(name)
+        and default_storage.exists(name)
+    )
+
+
+class SpooledBlob(File):
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class ContentAddressedMixin:
+    """
+    Store every upload once, as ``<upload_to>/<sha256>.<ext>``: the content is
+    hashed while it is spooled to disk, and a file that is already stored is
+    not written again. Rows sharing a blob share its name, so a blob is only
+    deleted once no row references it anymore.
+
+    Names derived from a blob (``<sha256>.<suffix>.<ext>``, e.g. resized
+    images) are kept as given and overwritten on save.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        if is_derived(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        if is_derived(name):
+            return super()._save(name, content)
+        if hasattr(content, "temporary_file_path"):
+            # already on disk, e.g. a big upload: hash it and move it in place
+            digest = hashlib.sha256()
+            for chunk in content.chunks():
+                digest.update(chunk)
+            return self._save_blob(name, content, digest.hexdigest())
+
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(
+            dir=settings.FILE_UPLOAD_TEMP_DIR, delete=False
+        ) as spool:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                spool.write(chunk)
+        try:
+            with open(spool.name, "rb") as blob:
+                return self._save_blob(name, SpooledBlob(blob), digest.hexdigest())
+        finally:
+            if os.path.exists(spool.name):
+                os.remove(spool.name)
+
+    def _save_blob(self, name, content, digest):
+        directory, basename = posixpath.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        name = posixpath.join(directory, digest + extension)
+        if not self.exists(name):
+            name = super()._save(name, content)
+        return name
+
+    def delete(self, name):
+        if name and is_referenced(name):
+            return
+        super().delete(name)
+
+
+class ContentAddressedStorage(ContentAddressedMixin, FileSystemStorage):
+    def _save(self, name, content):
+        if is_derived(name) and self.exists(name):
+            os.remove(self.path(name))
+        return super()._save(name, content)
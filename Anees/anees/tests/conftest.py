@@ -1,6 +1,13 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from model_bakery import baker
 from django.core.files.uploadedfile import SimpleUploadedFile
 from anees.models import (
@@ -15,6 +22,15 @@ from anees.models import (
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    for cache in caches.all():
+        cache.clear()
+    yield
+    for cache in caches.all():
+        cache.clear()
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -48,6 +64,19 @@ def authenticate(api_client, create_user):
     return _authenticate
 
 
+@pytest.fixture
+def jwt_authenticate(api_client, create_user):
+    """Authenticate with a real token, for the views that are not DRF views."""
+
+    def _jwt_authenticate(username="bassiony17", email="bassiony@gmail.com"):
+        user = create_user(username=username, email=email)
+        token = AccessToken.for_user(user)
+        api_client.credentials(HTTP_AUTHORIZATION=f"JWT {token}")
+        return user
+
+    return _jwt_authenticate
+
+
 @pytest.fixture
 def create_levels(create_level):
     def _create_levels():
@@ -60,12 +89,19 @@ def create_levels(create_level):
 
 
 @pytest.fixture
-def create_level(create_receptive_game, create_expressive_game, create_social_game):
+def create_level(
+    create_receptive_game,
+    create_expressive_game,
+    create_social_game,
+    django_capture_on_commit_callbacks,
+):
     def _create_level(level_num):
-        lev = Level.objects.create(level_num=level_num)
-        create_receptive_game(lev)
-        create_expressive_game(lev)
-        create_social_game(lev)
+        # saved together and committed, like the admin's level form
+        with django_capture_on_commit_callbacks(execute=True):
+            lev = Level.objects.create(level_num=level_num)
+            create_receptive_game(lev)
+            create_expressive_game(lev)
+            create_social_game(lev)
         return lev
 
     return _create_level
@@ -120,3 +156,40 @@ def create_social_game(create_img):
         return soc
 
     return _create_social_game
+
+
+class StubModelHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        url = urlsplit(self.path)
+        self.server.calls.append(
+            {"path": url.path, "query": parse_qs(url.query), "body": body}
+        )
+        time.sleep(self.server.delay)
+        payload = json.dumps(self.server.payload).encode()
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def model_server(settings):
+    """A local stand-in for the prediction model server."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubModelHandler)
+    server.daemon_threads = True
+    server.calls = []
+    server.delay = 0
+    server.status = 200
+    server.payload = {"prediction": "correct", "confidence": 0.9}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.AI_MODEL_URL = f"http://127.0.0.1:{server.server_port}"
+    settings.AI_MODEL_TOKEN = "model-token"
+    yield server
+    server.shutdown()
+    server.server_close()
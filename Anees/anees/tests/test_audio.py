@@ -0,0 +1,135 @@
+import io
+import wave
+import numpy as np
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import status
+from anees.audio import (
+    decode_wav,
+    encode_wav,
+    log_mel_spectrogram,
+    prepare_upload,
+    preprocess_audio,
+    resample,
+    trim_silence,
+)
+
+
+def recording(rate=44100, channels=2, seconds=1.0, silence=0.5):
+    time_axis = np.arange(int(seconds * rate)) / rate
+    voice = 0.3 * np.sin(2 * np.pi * 440 * time_axis)
+    quiet = np.zeros(int(silence * rate))
+    signal = np.concatenate([quiet, voice, quiet])
+    return encode_wav(np.repeat(signal[:, None], channels, axis=1), rate)
+
+
+class TestAudioPipeline:
+    def test_if_wav_round_trips(self):
+        samples, rate = decode_wav(recording(rate=8000, channels=2))
+
+        assert rate == 8000
+        assert samples.shape == (16000, 2)
+        assert np.abs(samples).max() == pytest.approx(0.3, abs=1e-3)
+
+    def test_if_resampling_keeps_duration_and_pitch(self):
+        rate = 44100
+        tone = np.sin(2 * np.pi * 440 * np.arange(rate) / rate).astype(np.float32)
+
+        resampled = resample(tone, rate, 16000)
+
+        assert len(resampled) == 16000
+        spectrum = np.abs(np.fft.rfft(resampled))
+        assert np.argmax(spectrum) == 440
+
+    def test_if_silence_is_trimmed(self):
+        samples, rate = decode_wav(recording(rate=16000, channels=1))
+
+        trimmed = trim_silence(samples[:, 0], rate)
+
+        assert len(trimmed) == pytest.approx(16000, abs=320)
+
+    def test_if_preprocessed_audio_is_mono_resampled_and_smaller(self):
+        raw = recording()
+
+        payload, content_type = preprocess_audio(raw, 16000)
+
+        assert content_type == "audio/wav"
+        with wave.open(io.BytesIO(payload)) as wav:
+            assert wav.getnchannels() == 1
+            assert wav.getframerate() == 16000
+            assert wav.getnframes() == pytest.approx(16000, abs=320)
+        assert len(payload) < len(raw) / 5
+
+    def test_if_features_are_log_mel_frames(self):
+        payload, content_type = preprocess_audio(recording(), 16000, features=True)
+
+        features = np.load(io.BytesIO(payload))
+        assert content_type == "application/x-npy"
+        assert features.shape[1] == 40
+        assert features.shape[0] == pytest.approx(98, abs=3)
+        assert log_mel_spectrogram(np.zeros(10), 16000).shape == (1, 40)
+
+    def test_if_other_uploads_pass_through(self):
+        upload = io.BytesIO(b"not audio")
+
+        assert prepare_upload("a.png", upload, "image/png", 16000) == (
+            "a.png",
+            upload,
+            "image/png",
+        )
+        assert prepare_upload("a.wav", upload, "audio/wav", 16000)[1] is upload
+
+    def test_if_invalid_sample_rate_passes_through(self):
+        header = bytearray(recording(rate=8000))
+        header[24:28] = bytes(4)
+        upload = io.BytesIO(bytes(header))
+
+        with pytest.raises(wave.Error):
+            decode_wav(bytes(header))
+        assert prepare_upload("a.wav", upload, "audio/wav", 16000)[1] is upload
+
+    def test_if_silent_recording_passes_through(self):
+        upload = io.BytesIO(encode_wav(np.zeros(8000), 8000))
+
+        assert prepare_upload("a.wav", upload, "audio/wav", 16000)[1] is upload
+
+    def test_if_file_is_decoded_in_blocks(self, monkeypatch):
+        monkeypatch.setattr("anees.audio.WAV_BLOCK_FRAMES", 1000)
+        raw = recording(rate=8000)
+
+        samples, _ = decode_wav(io.BytesIO(raw), mono=True)
+
+        assert np.array_equal(samples, decode_wav(raw)[0].mean(axis=1))
+
+
+@pytest.mark.django_db
+class TestPredictPreprocessing:
+    def test_if_model_receives_preprocessed_audio(
+        self, api_client, model_server, jwt_authenticate, settings
+    ):
+        settings.PREDICTION_PREPROCESS_AUDIO = 1
+        jwt_authenticate()
+        raw = recording()
+        upload = SimpleUploadedFile("voice.wav", raw, "audio/wav")
+
+        response = api_client.post(
+            "/api/predict/", {"label": "cat", "file": upload}, format="multipart"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        body = model_server.calls[0]["body"]
+        assert b'filename="voice.wav"' in body
+        assert len(body) < len(raw) / 5
+
+    def test_if_preprocessing_is_off_by_default(
+        self, api_client, model_server, jwt_authenticate
+    ):
+        jwt_authenticate()
+        raw = recording()
+        upload = SimpleUploadedFile("voice.wav", raw, "audio/wav")
+
+        api_client.post(
+            "/api/predict/", {"label": "cat", "file": upload}, format="multipart"
+        )
+
+        assert raw in model_server.calls[0]["body"]
@@ -1,8 +1,14 @@
+import json
+from base64 import urlsafe_b64encode
 from rest_framework import status
 import pytest
-from anees.models import Level
+from io import StringIO
+from anees.models import ChildLevel, ChildProgressSummary, Level, Receptive
 from model_bakery import baker
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 
 @pytest.mark.django_db
@@ -106,3 +112,235 @@ class TestUpdateChild:
 
         assert response.status_code == status.HTTP_200_OK
         assert response.data["picture"] != ""
+
+
+@pytest.mark.django_db
+class TestChildrenListPagination:
+    def create_children(self, create_user, names):
+        for index, (first_name, last_name) in enumerate(names):
+            user = create_user(
+                username=f"child{index}", email=f"child{index}@gmail.com"
+            )
+            user.first_name = first_name
+            user.last_name = last_name
+            user.save()
+
+    def test_if_children_list_is_paginated_by_name(
+        self, api_client, authenticate, create_user
+    ):
+        authenticate(is_staff=True)
+        self.create_children(
+            create_user, [("Omar", "Ali"), ("Adam", "Zaki"), ("Adam", "Amr")]
+        )
+
+        response = api_client.get("/api/children/", {"page_size": 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["previous"] is None
+        names = [child["user_info"]["first_name"] for child in response.data["results"]]
+        assert names == ["Adam", "Adam"]
+        assert response.data["results"][0]["user_info"]["last_name"] == "Amr"
+
+        response = api_client.get(response.data["next"])
+        names = [child["user_info"]["first_name"] for child in response.data["results"]]
+        assert names == ["Mahmoud", "Omar"]
+        assert response.data["next"] is None
+
+        response = api_client.get(response.data["previous"])
+        names = [child["user_info"]["last_name"] for child in response.data["results"]]
+        assert names == ["Amr", "Zaki"]
+
+    def test_if_children_with_same_name_are_not_skipped(
+        self, api_client, authenticate, create_user
+    ):
+        authenticate(is_staff=True)
+        self.create_children(create_user, [("Adam", "Amr")] * 3)
+
+        usernames = []
+        url = "/api/children/?page_size=1"
+        while url:
+            response = api_client.get(url)
+            usernames += [c["user_info"]["username"] for c in response.data["results"]]
+            url = response.data["next"]
+
+        assert len(usernames) == 4
+        assert len(set(usernames)) == 4
+
+    def test_if_invalid_cursor_returns_404(self, api_client, authenticate):
+        authenticate(is_staff=True)
+        response = api_client.get("/api/children/", {"cursor": "not-a-cursor"})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize(
+        "position", [["a", "b", "x"], ["a", "b", {"id": 1}], ["a", "b", None]]
+    )
+    def test_if_cursor_with_wrong_values_returns_404(
+        self, api_client, authenticate, position
+    ):
+        authenticate(is_staff=True)
+        payload = json.dumps({"p": position, "r": 0}).encode()
+        cursor = urlsafe_b64encode(payload).decode()
+        response = api_client.get("/api/children/", {"cursor": cursor})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestChildrenProgressAnnotations:
+    def test_if_accuracy_only_counts_completed_levels(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        api_client.post("/api/levels/1/receptive/", {"score": 80})
+        api_client.post("/api/levels/1/expressive/", {"score": 60})
+        api_client.post("/api/levels/1/social/", {"score": 40})
+        api_client.post("/api/levels/2/receptive/", {"score": 10})
+
+        response = api_client.get("/api/children/me/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["current_level"] == 2
+        assert response.data["join_duration_in_days"] == 0
+        assert response.data["accuracy"] == {
+            "receptive": 80,
+            "expressive": 60,
+            "social": 40,
+        }
+
+    def test_if_children_list_runs_fixed_number_of_queries(
+        self, api_client, authenticate, create_user, create_levels
+    ):
+        create_levels()
+        authenticate(is_staff=True)
+        create_user(username="child1", email="child1@gmail.com")
+        with CaptureQueriesContext(connection) as few_children:
+            api_client.get("/api/children/")
+
+        for index in range(2, 6):
+            create_user(username=f"child{index}", email=f"child{index}@gmail.com")
+        with CaptureQueriesContext(connection) as many_children:
+            response = api_client.get("/api/children/")
+
+        assert len(response.data["results"]) == 6
+        assert len(many_children) == len(few_children)
+
+
+@pytest.mark.django_db
+class TestChildProgressSummary:
+    def test_if_summary_is_updated_when_game_is_cleared(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        api_client.post("/api/levels/1/receptive/", {"score": 70})
+        api_client.post("/api/levels/1/expressive/", {"score": 90})
+        api_client.post("/api/levels/1/social/", {"score": 50})
+
+        summary = ChildProgressSummary.objects.get()
+        assert summary.current_level == 2
+        assert summary.completed_levels == 1
+        assert summary.receptive_accuracy == 70
+        assert summary.social_accuracy == 50
+
+    def test_if_profile_is_read_with_single_query(
+        self, api_client, authenticate, create_levels, django_assert_num_queries
+    ):
+        create_levels()
+        authenticate()
+        with django_assert_num_queries(1):
+            response = api_client.get("/api/children/me/")
+        assert response.data["current_level"] == 1
+
+    def test_if_rebuild_command_restores_summaries(self, authenticate, create_levels):
+        create_levels()
+        authenticate()
+        ChildProgressSummary.objects.all().delete()
+
+        call_command("rebuild_progress_summaries", stdout=StringIO())
+
+        summary = ChildProgressSummary.objects.get()
+        assert summary.current_level == 1
+        assert summary.completed_levels == 0
+
+    def test_if_deleted_level_leaves_summary(
+        self,
+        api_client,
+        authenticate,
+        create_levels,
+        django_capture_on_commit_callbacks,
+    ):
+        create_levels()
+        authenticate()
+        for game in ("receptive", "expressive", "social"):
+            api_client.post(f"/api/levels/1/{game}/", {"score": 80})
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Level.objects.get(level_num=1).delete()
+
+        summary = ChildProgressSummary.objects.get()
+        assert summary.current_level == 1
+        assert summary.completed_levels == 0
+        assert summary.receptive_accuracy == 0
+
+    def test_if_deleted_child_level_leaves_summary(
+        self, authenticate, create_levels, django_capture_on_commit_callbacks
+    ):
+        create_levels()
+        authenticate()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            ChildLevel.objects.all().delete()
+
+        assert ChildProgressSummary.objects.get().current_level == 0
+
+    def test_if_deleted_user_takes_summary_along(
+        self, create_user, create_levels, django_capture_on_commit_callbacks
+    ):
+        create_levels()
+        user = create_user()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.delete()
+
+        assert not ChildProgressSummary.objects.exists()
+
+
+@pytest.mark.django_db
+class TestChildWords:
+    def test_if_completed_games_words_are_returned_in_level_order(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        Receptive.objects.filter(level__level_num=2).update(answer="apple")
+        api_client.post("/api/levels/1/receptive/", {"score": 100})
+        api_client.post("/api/levels/1/expressive/", {"score": 100})
+        api_client.post("/api/levels/1/social/", {"score": 100})
+        api_client.post("/api/levels/2/receptive/", {"score": 100})
+
+        response = api_client.get("/api/children/me/words/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["words"] == {
+            "receptive": ["test4", "apple"],
+            "expressive": ["test"],
+        }
+
+    def test_if_cached_words_do_not_query_database(
+        self, api_client, authenticate, create_levels, django_assert_num_queries
+    ):
+        create_levels()
+        authenticate()
+        api_client.get("/api/children/me/words/")
+
+        with django_assert_num_queries(0):
+            response = api_client.get("/api/children/me/words/")
+        assert response.data["words"]["receptive"] == []
+
+    def test_if_words_cache_is_invalidated_when_game_is_completed(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        api_client.get("/api/children/me/words/")
+        api_client.post("/api/levels/1/expressive/", {"score": 100})
+
+        response = api_client.get("/api/children/me/words/")
+        assert response.data["words"]["expressive"] == ["test"]
@@ -0,0 +1,116 @@
+from io import BytesIO, StringIO
+import pytest
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+from rest_framework import status
+from anees.images import (
+    build_pending_variants,
+    generate_image_variants,
+    pending_variants,
+)
+from anees.models import Child, Expressive, Level, ReceptiveImage
+
+
+def solid_image(color, size=(300, 200)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return SimpleUploadedFile("solid.png", buffer.getvalue(), "image/png")
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_VARIANT_SIZES = {"thumbnail": 160, "medium": 640}
+
+
+@pytest.mark.django_db
+class TestImageVariants:
+    def test_if_replaced_image_is_pending_until_built(self, create_level):
+        level = create_level(1)
+        generate_image_variants(Expressive, Expressive.objects.get(level=level).pk)
+        assert not pending_variants(Expressive).exists()
+
+        expressive = Expressive.objects.get(level=level)
+        expressive.img = solid_image("blue")
+        expressive.save()
+
+        assert list(pending_variants(Expressive)) == [expressive]
+        assert build_pending_variants(Expressive, set()) == 1
+        assert not pending_variants(Expressive).exists()
+
+    def test_if_removed_picture_is_pending(self, create_user):
+        child = Child.objects.get(user=create_user())
+        assert not pending_variants(Child).exists()
+
+        child.picture = solid_image("green")
+        child.save()
+        generate_image_variants(Child, child.pk)
+        Child.objects.filter(pk=child.pk).update(picture=None)
+
+        assert list(pending_variants(Child)) == [child]
+        generate_image_variants(Child, child.pk)
+        assert Child.objects.get(pk=child.pk).picture_variants == {}
+
+    def test_if_broken_image_is_not_retried(self, create_level):
+        level = create_level(1)
+        expressive = Expressive.objects.get(level=level)
+        with default_storage.open(expressive.img.name, "wb") as image:
+            image.write(b"not an image")
+
+        failed = set()
+        assert build_pending_variants(Expressive, failed) == 0
+        assert failed == {(Expressive, expressive.pk, expressive.img.name)}
+        assert build_pending_variants(Expressive, failed) == 0
+
+    def test_if_variants_are_stored_next_to_original(self, create_level):
+        level = create_level(1)
+        expressive = Expressive.objects.get(level=level)
+        version = Level.objects.get(pk=level.pk).content_version
+
+        variants = generate_image_variants(Expressive, expressive.pk)
+
+        root = expressive.img.name.rsplit(".", 1)[0]
+        assert variants["thumbnail"]["webp"] == f"{root}.thumbnail.webp"
+        assert variants["medium"]["jpeg"] == f"{root}.medium.jpeg"
+        with default_storage.open(variants["thumbnail"]["jpeg"]) as thumbnail:
+            assert Image.open(thumbnail).size == (160, 160)
+        expressive.refresh_from_db()
+        assert expressive.img_variants == variants
+        assert Level.objects.get(pk=level.pk).content_version > version
+
+    def test_if_replaced_image_drops_old_variants(self, create_level):
+        level = create_level(1)
+        expressive = Expressive.objects.get(level=level)
+        old = generate_image_variants(Expressive, expressive.pk)
+
+        expressive.refresh_from_db()
+        expressive.img = solid_image("red")
+        expressive.save()
+        generate_image_variants(Expressive, expressive.pk)
+
+        assert not default_storage.exists(old["thumbnail"]["webp"])
+
+    def test_if_game_exposes_variant_urls(self, api_client, authenticate, create_level):
+        authenticate()
+        level = create_level(1)
+        expressive = Expressive.objects.get(level=level)
+        generate_image_variants(Expressive, expressive.pk)
+
+        response = api_client.get("/api/levels/1/expressive/")
+
+        assert response.status_code == status.HTTP_200_OK
+        urls = response.data["img_variants"]
+        assert set(urls) == {"thumbnail", "medium"}
+        assert urls["thumbnail"]["webp"].endswith(".thumbnail.webp")
+
+    def test_if_command_builds_missing_variants(self, create_level):
+        create_level(1)
+
+        out = StringIO()
+        call_command("generate_image_variants", stdout=out)
+
+        assert all(image.img_variants for image in ReceptiveImage.objects.all())
+        assert Expressive.objects.get().img_variants
+        assert "Receptive Games Images: 4 built" in out.getvalue()
@@ -1,7 +1,20 @@
+import datetime
+from io import StringIO
 from rest_framework import status
 import pytest
-from anees.models import Level
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from anees.models import (
+    ChildLevel,
+    ChildProgressSummary,
+    Level,
+    Social,
+    conversionMessage,
+)
 from model_bakery import baker
+from anees import availability
+from anees.availability import game_availability
 
 
 @pytest.mark.django_db
@@ -17,9 +30,12 @@ class TestRetrieveLevels:
         print(response.status_code)
         assert response.status_code == status.HTTP_200_OK
 
-    def test_if_level_exists_returns_200(self, api_client, authenticate):
+    def test_if_level_exists_returns_200(
+        self, api_client, authenticate, django_capture_on_commit_callbacks
+    ):
         authenticate()
-        level = baker.make(Level, level_num=1)
+        with django_capture_on_commit_callbacks(execute=True):
+            level = baker.make(Level, level_num=1)
         response = api_client.get("/api/levels/1/")
         assert response.status_code == status.HTTP_200_OK
         assert response.data["level_num"] == level.level_num
@@ -91,3 +107,363 @@ class TestRetrieveLevels:
         response = api_client.get("/api/levels/1/")
         assert response.status_code == status.HTTP_200_OK
         assert response.data["receptive_score"] == 100
+
+
+@pytest.mark.django_db
+class TestGameAvailability:
+    def test_if_games_bitmask_follows_game_changes(self, create_level):
+        level = create_level(1)
+        level.refresh_from_db()
+        assert level.games == Level.RECEPTIVE | Level.EXPRESSIVE | Level.SOCIAL
+
+        Social.objects.filter(level=level).first().delete()
+        level.refresh_from_db()
+        assert not level.has_game("social")
+        assert level.has_game("receptive")
+
+    def test_if_availability_map_is_reloaded_after_change(self, create_level):
+        level = create_level(1)
+        assert game_availability()[level.pk] == 7
+
+        Social.objects.filter(level=level).delete()
+        assert game_availability()[level.pk] == Level.RECEPTIVE | Level.EXPRESSIVE
+
+    def test_if_map_read_before_commit_is_reloaded(
+        self, create_level, django_capture_on_commit_callbacks
+    ):
+        level = create_level(1)
+        game_availability()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Social.objects.filter(level=level).delete()
+            # another worker reads the old rows after the first bump
+            availability._level_games = (
+                availability._generation(),
+                {level.pk: Level.RECEPTIVE | Level.EXPRESSIVE | Level.SOCIAL},
+            )
+
+        assert game_availability()[level.pk] == Level.RECEPTIVE | Level.EXPRESSIVE
+
+    def test_if_level_detail_links_games_without_extra_queries(
+        self, api_client, authenticate, create_level, django_assert_num_queries
+    ):
+        create_level(1)
+        authenticate()
+
+        with django_assert_num_queries(1):
+            response = api_client.get("/api/levels/1/")
+        assert response.data["receptive"].endswith("/api/levels/1/receptive/")
+        assert response.data["social"].endswith("/api/levels/1/social/")
+
+
+@pytest.mark.django_db
+class TestGameContentCache:
+    def test_if_cached_game_costs_one_query(
+        self, api_client, authenticate, create_levels, django_assert_num_queries
+    ):
+        create_levels()
+        authenticate()
+        api_client.get("/api/levels/1/receptive/")
+
+        with django_assert_num_queries(1):
+            response = api_client.get("/api/levels/1/receptive/")
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["images"]) == 4
+
+    def test_if_editing_game_content_refreshes_cache(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        api_client.get("/api/levels/1/social/")
+
+        social = Social.objects.get(level__level_num=1)
+        conversionMessage.objects.create(message="test5", social=social)
+        response = api_client.get("/api/levels/1/social/")
+        assert len(response.data["messages"]) == 5
+
+        conversionMessage.objects.filter(social=social).first().delete()
+        response = api_client.get("/api/levels/1/social/")
+        assert len(response.data["messages"]) == 4
+
+    def test_if_missing_game_returns_404(
+        self, api_client, authenticate, django_capture_on_commit_callbacks
+    ):
+        authenticate()
+        with django_capture_on_commit_callbacks(execute=True):
+            baker.make(Level, level_num=1)
+        response = api_client.get("/api/levels/1/expressive/")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_warm_command_fills_cache(
+        self, api_client, authenticate, create_levels, django_assert_num_queries
+    ):
+        create_levels()
+        authenticate()
+        call_command("warm_content_cache", stdout=StringIO())
+
+        with django_assert_num_queries(1):
+            response = api_client.get("/api/levels/1/expressive/")
+        assert response.data["answer"] == "test"
+
+
+@pytest.mark.django_db
+class TestLevelBundle:
+    def test_if_bundle_holds_level_and_games(
+        self, api_client, authenticate, create_levels, django_assert_max_num_queries
+    ):
+        create_levels()
+        authenticate()
+
+        with django_assert_max_num_queries(6):
+            response = api_client.get("/api/levels/1/bundle/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["level_num"] == 1
+        assert len(response.data["games"]["receptive"]["images"]) == 4
+        assert response.data["games"]["expressive"]["answer"] == "test"
+        assert len(response.data["games"]["social"]["messages"]) == 4
+
+    def test_if_cached_bundle_costs_one_query(
+        self, api_client, authenticate, create_levels, django_assert_num_queries
+    ):
+        create_levels()
+        authenticate()
+        api_client.get("/api/levels/1/receptive/")
+        api_client.get("/api/levels/1/bundle/")
+
+        with django_assert_num_queries(1):
+            response = api_client.get("/api/levels/1/bundle/")
+        assert response.data["games"]["receptive"] == api_client.get(
+            "/api/levels/1/receptive/"
+        ).data
+
+    def test_if_missing_game_is_null(
+        self, api_client, authenticate, django_capture_on_commit_callbacks
+    ):
+        authenticate()
+        with django_capture_on_commit_callbacks(execute=True):
+            baker.make(Level, level_num=1)
+
+        response = api_client.get("/api/levels/1/bundle/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["games"]["expressive"] is None
+
+    def test_if_locked_level_returns_401(self, api_client, authenticate, create_levels):
+        create_levels()
+        authenticate()
+
+        response = api_client.get("/api/levels/2/bundle/")
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_bundle_etag_changes_after_score_update(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        etag = api_client.get("/api/levels/1/bundle/").headers["ETag"]
+        response = api_client.get("/api/levels/1/bundle/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        api_client.post("/api/levels/1/receptive/", {"score": 100})
+        response = api_client.get("/api/levels/1/bundle/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["receptive_score"] == 100
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    def test_if_matching_etag_returns_304(
+        self, api_client, authenticate, create_levels, django_assert_num_queries
+    ):
+        create_levels()
+        authenticate()
+        response = api_client.get("/api/levels/1/expressive/")
+        etag = response.headers["ETag"]
+        assert response.headers["Last-Modified"]
+
+        with django_assert_num_queries(1):
+            response = api_client.get(
+                "/api/levels/1/expressive/", HTTP_IF_NONE_MATCH=etag
+            )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["ETag"] == etag
+
+    def test_if_level_etag_changes_after_score_update(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        etag = api_client.get("/api/levels/1/").headers["ETag"]
+        response = api_client.get("/api/levels/1/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        api_client.post("/api/levels/1/receptive/", {"score": 100})
+        response = api_client.get("/api/levels/1/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["receptive_score"] == 100
+
+    def test_if_levels_list_etag_changes_when_level_is_unlocked(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        etag = api_client.get("/api/levels/").headers["ETag"]
+        api_client.post("/api/levels/1/receptive/", {"score": 100})
+        response = api_client.get("/api/levels/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        api_client.post("/api/levels/1/expressive/", {"score": 100})
+        api_client.post("/api/levels/1/social/", {"score": 100})
+        response = api_client.get("/api/levels/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 2
+
+
+@pytest.mark.django_db
+class TestScoreSubmission:
+    def post_counting_queries(self, api_client, url, score):
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post(url, {"score": score})
+        statements = [
+            query["sql"]
+            for query in queries
+            if not query["sql"].startswith(("SAVEPOINT", "RELEASE SAVEPOINT"))
+        ]
+        return response, statements
+
+    def test_if_level_completion_is_recorded_with_bounded_queries(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        api_client.post("/api/levels/1/receptive/", {"score": 100})
+        api_client.post("/api/levels/1/expressive/", {"score": 100})
+
+        response, statements = self.post_counting_queries(
+            api_client, "/api/levels/1/social/", 90
+        )
+        assert response.data == {"success": "You Have Passed This Level"}
+        assert len(statements) <= 5
+
+        level = ChildLevel.objects.get(level__level_num=1)
+        assert level.completed_date == datetime.date.today()
+        assert ChildLevel.objects.filter(level__level_num=2).exists()
+        assert ChildProgressSummary.objects.get().social_accuracy == 90
+
+    def test_if_lower_score_keeps_high_score(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        api_client.post("/api/levels/1/expressive/", {"score": 90})
+        response, statements = self.post_counting_queries(
+            api_client, "/api/levels/1/expressive/", 30
+        )
+        assert response.data == {"success": "You Have Completed This Game"}
+        assert len(statements) == 2
+        assert ChildLevel.objects.get().expressive_score == 90
+
+    def test_if_replaying_completed_level_reports_high_score(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        for game in ("receptive", "expressive", "social"):
+            api_client.post(f"/api/levels/1/{game}/", {"score": 50})
+
+        response = api_client.post("/api/levels/1/receptive/", {"score": 100})
+        assert response.data == {
+            "success": "You Have Passed This Level With New High Score"
+        }
+        assert ChildLevel.objects.filter(level__level_num=2).count() == 1
+        assert ChildProgressSummary.objects.get().receptive_accuracy == 100
+
+    def test_if_next_level_already_unlocked_is_not_counted_again(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        child_id = ChildLevel.objects.get().child_id
+        api_client.post("/api/levels/1/receptive/", {"score": 100})
+        api_client.post("/api/levels/1/expressive/", {"score": 100})
+        current_level = ChildProgressSummary.objects.get().current_level
+        ChildLevel.objects.create(
+            child_id=child_id, level=Level.objects.get(level_num=2)
+        )
+
+        response = api_client.post("/api/levels/1/social/", {"score": 100})
+        assert response.status_code == status.HTTP_200_OK
+        assert ChildLevel.objects.filter(level__level_num=2).count() == 1
+        summary = ChildProgressSummary.objects.get()
+        assert summary.current_level == current_level
+
+    def test_if_last_level_reports_all_levels_finished(
+        self, api_client, authenticate, create_level
+    ):
+        create_level(1)
+        authenticate()
+        api_client.post("/api/levels/1/receptive/", {"score": 100})
+        api_client.post("/api/levels/1/expressive/", {"score": 100})
+        response = api_client.post("/api/levels/1/social/", {"score": 100})
+        assert response.data == {"success": "You Have Finished All Levels"}
+
+    def test_if_invalid_score_returns_400(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        response = api_client.post("/api/levels/1/social/", {"score": "high"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestScoreSync:
+    def test_if_batch_clears_levels_in_order(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        results = [
+            {"level": 2, "game": "receptive", "score": 70},
+            {"level": 1, "game": "receptive", "score": 100},
+            {"level": 1, "game": "expressive", "score": 90},
+            {"level": 1, "game": "social", "score": 80},
+            {"level": 3, "game": "social", "score": 100},
+        ]
+        response = api_client.post(
+            "/api/levels/sync/", {"results": results}, format="json"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["unlocked"] == [2]
+        statuses = [result["status"] for result in response.data["results"]]
+        assert statuses == ["recorded"] * 4 + ["locked"]
+        level_two = ChildLevel.objects.get(level__level_num=2)
+        assert level_two.receptive_score == 70
+        assert ChildLevel.objects.get(level__level_num=1).completed_date
+        summary = ChildProgressSummary.objects.get()
+        assert summary.current_level == 2
+        assert summary.expressive_accuracy == 90
+
+    def test_if_batch_keeps_high_scores(self, api_client, authenticate, create_levels):
+        create_levels()
+        authenticate()
+        results = [
+            {"level": 1, "game": "social", "score": 90},
+            {"level": 1, "game": "social", "score": 40},
+        ]
+        response = api_client.post(
+            "/api/levels/sync/", {"results": results}, format="json"
+        )
+        assert [r["new_high_score"] for r in response.data["results"]] == [
+            True,
+            False,
+        ]
+        assert ChildLevel.objects.get().social_score == 90
+
+    def test_if_empty_batch_returns_400(self, api_client, authenticate):
+        authenticate()
+        response = api_client.post("/api/levels/sync/", {"results": []}, format="json")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,211 @@
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import status
+from anees.images import generate_image_variants
+from anees.models import Child, Expressive, ReceptiveImage, Social
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_VARIANT_SIZES = {"thumbnail": 160}
+    settings.MEDIA_ACCEL_REDIRECT = False
+
+
+@pytest.mark.django_db
+class TestProtectedMedia:
+    def test_if_user_is_anonymous_returns_401(self, api_client, create_level):
+        level = create_level(1)
+        expressive = Expressive.objects.get(level=level)
+
+        response = api_client.get(expressive.img.url)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_own_picture_returns_200(self, api_client, authenticate, create_img):
+        authenticate()
+        child = Child.objects.get()
+        child.picture = create_img()
+        child.save()
+
+        response = api_client.get(child.picture.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "image/png"
+        assert response["Cache-Control"] == "private, max-age=31536000, immutable"
+        assert b"".join(response.streaming_content) == child.picture.read()
+
+    def test_if_other_child_picture_returns_403(
+        self, api_client, authenticate, create_user, create_img
+    ):
+        other = create_user(username="other", email="other@gmail.com")
+        other.child.picture = create_img()
+        other.child.save()
+        authenticate()
+
+        response = api_client.get(other.child.picture.url)
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_shared_picture_returns_200_to_every_owner(
+        self, api_client, authenticate, create_user, create_img
+    ):
+        other = create_user(username="other", email="other@gmail.com")
+        other.child.picture = create_img()
+        other.child.save()
+        authenticate()
+        child = Child.objects.get(user__username="bassiony17")
+        child.picture = create_img()
+        child.save()
+        assert child.picture.name == other.child.picture.name
+
+        response = api_client.get(child.picture.url)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_if_unlocked_level_hands_off_to_nginx(
+        self, api_client, authenticate, create_level, settings
+    ):
+        settings.MEDIA_ACCEL_REDIRECT = True
+        level = create_level(1)
+        authenticate()
+        image = ReceptiveImage.objects.filter(receptive__level=level).first()
+
+        response = api_client.get(image.img.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["X-Accel-Redirect"] == f"/protected-media/{image.img.name}"
+        assert response.content == b""
+
+    def test_if_accel_redirect_name_is_percent_encoded(
+        self, api_client, authenticate, settings
+    ):
+        settings.MEDIA_ACCEL_REDIRECT = True
+        authenticate()
+        # an older upload, stored before names were content addressed
+        Child.objects.update(picture="profile/images/my photo ü.png")
+        child = Child.objects.get()
+
+        response = api_client.get(child.picture.url)
+
+        assert response["X-Accel-Redirect"] == (
+            "/protected-media/profile/images/my%20photo%20%C3%BC.png"
+        )
+
+    def test_if_session_user_returns_200(self, client, create_user, create_img):
+        user = create_user()
+        user.child.picture = create_img()
+        user.child.save()
+        client.force_login(user)
+
+        response = client.get(user.child.picture.url)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_if_media_is_not_sniffed(self, api_client, authenticate, create_img):
+        authenticate()
+        child = Child.objects.get()
+        child.picture = create_img()
+        child.save()
+
+        response = api_client.get(child.picture.url)
+
+        assert response["X-Content-Type-Options"] == "nosniff"
+        assert not response.get("Content-Disposition", "").startswith("attachment")
+
+    def test_if_other_file_is_sent_as_attachment(
+        self, api_client, authenticate, settings
+    ):
+        settings.MEDIA_ACCEL_REDIRECT = True
+        name = default_storage.save("level/social/x.html", ContentFile(b"<script>"))
+        authenticate(is_staff=True)
+
+        response = api_client.get(f"/api/media/{name}")
+
+        assert response["X-Content-Type-Options"] == "nosniff"
+        assert response["Content-Disposition"] == "attachment"
+
+    def test_if_locked_level_returns_403(self, api_client, authenticate, create_level):
+        create_level(1)
+        level = create_level(2)
+        authenticate()
+        expressive = Expressive.objects.get(level=level)
+        expressive.img = SimpleUploadedFile("other.png", b"other", "image/png")
+        expressive.save()
+
+        response = api_client.get(expressive.img.url)
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_staff_can_see_locked_level(
+        self, api_client, authenticate, create_level
+    ):
+        create_level(1)
+        level = create_level(2)
+        authenticate(is_staff=True)
+
+        response = api_client.get(Expressive.objects.get(level=level).img.url)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_if_image_variant_follows_original(
+        self, api_client, authenticate, create_level
+    ):
+        level = create_level(1)
+        authenticate()
+        expressive = Expressive.objects.get(level=level)
+        variants = generate_image_variants(Expressive, expressive.pk)
+
+        response = api_client.get(f"/api/media/{variants['thumbnail']['webp']}")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "image/webp"
+
+    def test_if_video_has_its_content_type(
+        self, api_client, authenticate, create_level, settings
+    ):
+        settings.MEDIA_ACCEL_REDIRECT = True
+        level = create_level(1)
+        authenticate()
+        social = Social.objects.get(level=level)
+        social.video = SimpleUploadedFile("clip.mp4", b"video", "video/mp4")
+        social.save()
+
+        response = api_client.get(social.video.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "video/mp4"
+
+    def test_if_path_leaves_media_root_returns_404(
+        self, api_client, authenticate, create_level
+    ):
+        create_level(1)
+        authenticate(is_staff=True)
+
+        response = api_client.get("/api/media/level/../../manage.py")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_shared_blob_follows_any_unlocked_row(
+        self, api_client, authenticate, create_level
+    ):
+        create_level(1)
+        level = create_level(2)
+        authenticate()
+        expressive = Expressive.objects.get(level=level)
+        assert (
+            expressive.img.name == Expressive.objects.get(level__level_num=1).img.name
+        )
+
+        response = api_client.get(expressive.img.url)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_if_unknown_file_returns_404(self, api_client, authenticate):
+        authenticate()
+
+        response = api_client.get("/api/media/level/expressive/missing.png")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import zipfile
+from io import StringIO
+import pytest
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from rest_framework import status
+from anees.content import bump_content_version
+from anees.models import Level, LevelPack
+from anees.packs import build_level_pack, build_stale_packs
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.MEDIA_ACCEL_REDIRECT = False
+
+
+def read_pack(pack):
+    with default_storage.open(pack.file.name) as file:
+        with zipfile.ZipFile(file) as archive:
+            return {name: archive.read(name) for name in archive.namelist()}
+
+
+@pytest.mark.django_db
+class TestLevelPacks:
+    def test_if_pack_holds_games_and_media(self, create_level):
+        level = create_level(1)
+
+        pack = build_level_pack(level)
+
+        entries = read_pack(pack)
+        manifest = json.loads(entries.pop("manifest.json"))
+        assert manifest["level_num"] == 1
+        assert manifest["games"]["expressive"]["answer"] == "test"
+        assert len(manifest["games"]["receptive"]["images"]) == 4
+        # the four receptive images are the same picture, stored once
+        assert len(manifest["files"]) == 3
+        for name, digest in manifest["files"].items():
+            assert hashlib.sha256(entries[f"media/{name}"]).hexdigest() == digest
+        assert pack.file.name == f"packs/{pack.digest}.zip"
+
+    def test_if_same_content_gives_same_archive(self, create_level):
+        level = create_level(1)
+        digest = build_level_pack(level).digest
+        LevelPack.objects.all().delete()
+
+        assert build_level_pack(level).digest == digest
+
+    def test_if_pack_is_only_rebuilt_after_content_change(self, create_level):
+        level = create_level(1)
+        levels = Level.objects.all()
+        pack = next(build_stale_packs(levels))
+
+        assert list(build_stale_packs(levels)) == []
+
+        level.expressive.answer = "changed"
+        level.expressive.save()
+        bump_content_version(pk=level.pk)
+        rebuilt = next(build_stale_packs(levels))
+        assert rebuilt.digest != pack.digest
+        assert not default_storage.exists(pack.file.name)
+
+    def test_if_command_builds_stale_packs(self, create_levels):
+        create_levels()
+        out = StringIO()
+        call_command("build_level_packs", "--levels", "1-2", stdout=out)
+        assert "Built 2 level packs" in out.getvalue()
+
+        out = StringIO()
+        call_command("build_level_packs", stdout=out)
+        assert "Built 2 level packs" in out.getvalue()
+        assert LevelPack.objects.count() == 4
+
+
+@pytest.mark.django_db
+class TestLevelPackApi:
+    def test_if_user_anonymous_returns_401(self, api_client):
+        response = api_client.get("/api/levels/packs/")
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_only_unlocked_levels_are_listed(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        call_command("build_level_packs", stdout=StringIO())
+        authenticate()
+
+        response = api_client.get("/api/levels/packs/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [pack["level_num"] for pack in response.data] == [1]
+        assert response.data[0]["url"].endswith(".zip")
+        assert not response.data[0]["stale"]
+
+    def test_if_packs_are_not_built_on_request(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+
+        response = api_client.get("/api/levels/packs/")
+
+        assert response.data == []
+        assert not LevelPack.objects.exists()
+
+    def test_if_changed_level_pack_is_flagged_stale(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        call_command("build_level_packs", stdout=StringIO())
+        bump_content_version(level_num=1)
+        authenticate()
+
+        response = api_client.get("/api/levels/packs/")
+
+        level = Level.objects.get(level_num=1)
+        assert response.data[0]["stale"]
+        assert response.data[0]["content_version"] == level.content_version - 1
+
+    def test_if_invalid_range_returns_400(self, api_client, authenticate):
+        authenticate()
+
+        response = api_client.get("/api/levels/packs/", {"levels": "5-3"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_pack_download_is_immutable(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        call_command("build_level_packs", stdout=StringIO())
+        authenticate()
+        url = api_client.get("/api/levels/packs/").data[0]["url"]
+
+        response = api_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/zip"
+        assert "immutable" in response["Cache-Control"]
+
+    def test_if_locked_level_pack_returns_403(
+        self, api_client, authenticate, create_levels
+    ):
+        create_levels()
+        authenticate()
+        pack = build_level_pack(Level.objects.get(level_num=2))
+
+        response = api_client.get(pack.file.url)
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,502 @@
+from datetime import timedelta
+from io import StringIO
+import asyncio
+import contextlib
+import numpy as np
+import pytest
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from rest_framework import status
+from anees.audio import encode_wav
+from anees.inference import LogMelFeatures, NumpyModel
+from anees.models import PredictionJob
+from anees.prediction_jobs import retry_delay
+from anees.prediction import _count, get_predictor, prediction_cache_stats
+
+
+@pytest.fixture
+def predict(api_client):
+    def _predict(label="cat", content=b"recording"):
+        data = {"file": SimpleUploadedFile("voice.wav", content, "audio/wav")}
+        if label:
+            data["label"] = label
+        return api_client.post("/api/predict/", data, format="multipart")
+
+    return _predict
+
+
+@pytest.fixture
+def submit_job(api_client):
+    def _submit_job(label="cat", content=b"recording"):
+        data = {"file": SimpleUploadedFile("voice.wav", content, "audio/wav")}
+        if label:
+            data["label"] = label
+        return api_client.post("/api/predict/jobs/", data, format="multipart")
+
+    return _submit_job
+
+
+@pytest.mark.django_db
+class TestPredict:
+    def test_if_user_anonymous_returns_401(self, predict, model_server):
+        response = predict()
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert model_server.calls == []
+
+    def test_if_label_is_missing_returns_400(
+        self, predict, model_server, jwt_authenticate
+    ):
+        jwt_authenticate()
+        response = predict(label=None)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert model_server.calls == []
+
+    def test_if_prediction_is_forwarded_returns_model_response(
+        self, predict, model_server, jwt_authenticate
+    ):
+        jwt_authenticate()
+        response = predict(content=b"hello model")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == model_server.payload
+        call = model_server.calls[0]
+        assert call["path"] == "/predict"
+        assert call["query"] == {"label": ["cat"], "access_token": ["model-token"]}
+        assert b"hello model" in call["body"]
+
+    def test_if_model_is_slow_returns_504(
+        self, predict, model_server, jwt_authenticate, settings
+    ):
+        jwt_authenticate()
+        settings.AI_MODEL_READ_TIMEOUT = 0.1
+        model_server.delay = 0.5
+
+        response = predict()
+
+        assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+
+    def test_if_model_keeps_failing_circuit_opens(
+        self, predict, model_server, jwt_authenticate, settings
+    ):
+        jwt_authenticate()
+        settings.AI_MODEL_FAILURE_THRESHOLD = 2
+        model_server.status = 500
+
+        assert predict().status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        assert predict().status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        response = predict()
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert len(model_server.calls) == 2
+
+    def test_if_circuit_recovers_after_successful_trial(
+        self, predict, model_server, jwt_authenticate, settings
+    ):
+        jwt_authenticate()
+        settings.AI_MODEL_FAILURE_THRESHOLD = 1
+        settings.AI_MODEL_RECOVERY_TIME = 0
+        model_server.status = 500
+        predict()
+        model_server.status = 200
+
+        assert predict().status_code == status.HTTP_200_OK
+        assert predict().status_code == status.HTTP_200_OK
+
+    def test_if_cancelled_trial_does_not_keep_circuit_open(
+        self, model_server, settings
+    ):
+        settings.AI_MODEL_FAILURE_THRESHOLD = 1
+        settings.AI_MODEL_RECOVERY_TIME = 0
+        model_server.status = 500
+        client = get_predictor()
+
+        async def cancel_trial():
+            await client.predict("cat", "voice.wav", b"recording")
+            model_server.delay = 1
+            trial = asyncio.create_task(client.predict("cat", "voice.wav", b"x"))
+            await asyncio.sleep(0.2)
+            trial.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await trial
+            model_server.delay = 0
+            model_server.status = 200
+            return await client.predict("cat", "voice.wav", b"recording")
+
+        status_code, _ = asyncio.run(cancel_trial())
+
+        assert status_code == status.HTTP_200_OK
+        assert not client.breaker.is_open
+
+    def test_if_pool_is_closed_with_its_event_loop(self, model_server):
+        client = get_predictor()
+
+        asyncio.run(client.predict("cat", "voice.wav", b"recording"))
+
+        assert client._client.is_closed
+
+
+@pytest.mark.django_db
+class TestPredictionUploads:
+    def test_if_file_is_too_large_returns_413(
+        self, predict, model_server, jwt_authenticate, settings
+    ):
+        settings.PREDICTION_MAX_UPLOAD_SIZE = 1024
+        jwt_authenticate()
+
+        response = predict(content=b"x" * 2048)
+
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert model_server.calls == []
+
+    def test_if_file_type_is_not_supported_returns_415(
+        self, api_client, model_server, jwt_authenticate
+    ):
+        jwt_authenticate()
+        upload = SimpleUploadedFile("notes.txt", b"text", "text/plain")
+
+        response = api_client.post(
+            "/api/predict/", {"label": "cat", "file": upload}, format="multipart"
+        )
+
+        assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        assert model_server.calls == []
+
+    def test_if_large_file_is_streamed_to_model(
+        self, predict, model_server, jwt_authenticate
+    ):
+        jwt_authenticate()
+        content = bytes(range(256)) * 8 * 1024
+
+        response = predict(content=content)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert content in model_server.calls[0]["body"]
+
+    def test_if_queued_file_is_too_large_returns_413(
+        self, submit_job, jwt_authenticate, settings
+    ):
+        settings.PREDICTION_MAX_UPLOAD_SIZE = 1024
+        jwt_authenticate()
+
+        response = submit_job(content=b"x" * 2048)
+
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert not PredictionJob.objects.exists()
+
+
+@pytest.mark.django_db
+class TestPredictionCache:
+    def test_if_same_file_and_label_is_served_from_cache(
+        self, predict, model_server, jwt_authenticate
+    ):
+        jwt_authenticate()
+        first = predict(content=b"same recording")
+        second = predict(content=b"same recording")
+
+        assert first["X-Prediction-Cache"] == "MISS"
+        assert second["X-Prediction-Cache"] == "HIT"
+        assert second.status_code == status.HTTP_200_OK
+        assert second.json() == model_server.payload
+        assert len(model_server.calls) == 1
+
+    def test_if_label_file_or_model_version_differs_cache_misses(
+        self, predict, model_server, jwt_authenticate, settings
+    ):
+        jwt_authenticate()
+        predict(label="cat", content=b"recording")
+        predict(label="dog", content=b"recording")
+        predict(label="cat", content=b"other recording")
+        settings.AI_MODEL_VERSION = "2"
+        predict(label="cat", content=b"recording")
+
+        assert len(model_server.calls) == 4
+
+    def test_if_preprocessing_differs_cache_misses(
+        self, predict, model_server, jwt_authenticate, settings
+    ):
+        jwt_authenticate()
+        predict(content=b"recording")
+        settings.PREDICTION_SAMPLE_RATE = 8000
+        predict(content=b"recording")
+        settings.PREDICTION_AUDIO_FEATURES = 1
+        predict(content=b"recording")
+
+        assert len(model_server.calls) == 3
+
+    def test_if_model_error_is_not_cached(
+        self, predict, model_server, jwt_authenticate
+    ):
+        jwt_authenticate()
+        model_server.status = 400
+        predict()
+        predict()
+
+        assert len(model_server.calls) == 2
+
+    def test_if_admin_gets_cache_stats_returns_200(
+        self, api_client, predict, model_server, jwt_authenticate
+    ):
+        user = jwt_authenticate()
+        predict()
+        predict()
+        predict(label="dog")
+        user.is_staff = True
+        user.save()
+
+        response = api_client.get("/api/predict/stats/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"hits": 1, "misses": 2, "hit_rate": 1 / 3}
+
+    def test_if_cache_stats_survive_eviction(
+        self, api_client, predict, model_server, jwt_authenticate
+    ):
+        user = jwt_authenticate()
+        for index in range(4):
+            predict(content=bytes([index]))
+        caches["predictions"].clear()
+        user.is_staff = True
+        user.save()
+
+        response = api_client.get("/api/predict/stats/")
+
+        assert response.data["misses"] == 4
+
+    def test_if_first_lookups_are_all_counted(self):
+        async def count_many():
+            await asyncio.gather(*(_count("misses") for _ in range(10)))
+
+        asyncio.run(count_many())
+
+        assert prediction_cache_stats()["misses"] == 10
+
+    def test_if_user_is_not_admin_cache_stats_returns_403(
+        self, api_client, authenticate
+    ):
+        authenticate()
+        response = api_client.get("/api/predict/stats/")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def run_worker():
+    call_command("run_prediction_worker", "--once", stdout=StringIO())
+
+
+@pytest.mark.django_db
+class TestPredictionJobs:
+    def test_if_job_is_queued_returns_202(
+        self, submit_job, model_server, jwt_authenticate
+    ):
+        jwt_authenticate()
+        response = submit_job()
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data["status"] == "Pending"
+        assert response.data["url"].endswith(
+            f"/api/predict/jobs/{response.data['id']}/"
+        )
+        assert model_server.calls == []
+
+    def test_if_label_is_missing_returns_400(self, submit_job, jwt_authenticate):
+        jwt_authenticate()
+        response = submit_job(label=None)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_worker_runs_job_result_is_returned(
+        self, api_client, submit_job, model_server, jwt_authenticate
+    ):
+        jwt_authenticate()
+        job_id = submit_job(content=b"hello model").data["id"]
+
+        run_worker()
+        response = api_client.get(f"/api/predict/jobs/{job_id}/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["status"] == "Done"
+        assert response.json()["status_code"] == 200
+        assert response.json()["result"] == model_server.payload
+        assert b"hello model" in model_server.calls[0]["body"]
+        assert not PredictionJob.objects.get(pk=job_id).file
+
+    def test_if_job_is_pending_long_poll_times_out(
+        self, api_client, submit_job, model_server, jwt_authenticate, settings
+    ):
+        settings.PREDICTION_JOB_POLL_INTERVAL = 0.05
+        jwt_authenticate()
+        job_id = submit_job().data["id"]
+
+        response = api_client.get(f"/api/predict/jobs/{job_id}/", {"wait": 0.2})
+
+        assert response.json()["status"] == "Pending"
+
+    def test_if_model_is_down_job_is_retried_then_fails(
+        self, submit_job, model_server, jwt_authenticate, settings
+    ):
+        settings.PREDICTION_JOB_MAX_ATTEMPTS = 2
+        settings.PREDICTION_JOB_RETRY_DELAY = 0
+        settings.AI_MODEL_READ_TIMEOUT = 0.1
+        settings.AI_MODEL_FAILURE_THRESHOLD = 10
+        model_server.delay = 0.3
+        jwt_authenticate()
+        job_id = submit_job().data["id"]
+
+        run_worker()
+
+        job = PredictionJob.objects.get(pk=job_id)
+        assert job.status == PredictionJob.FAILED
+        assert job.attempts == 2
+        assert len(model_server.calls) == 2
+
+    def test_if_retried_job_waits_for_backoff(
+        self, submit_job, model_server, jwt_authenticate, settings
+    ):
+        settings.PREDICTION_JOB_RETRY_DELAY = 60
+        settings.AI_MODEL_READ_TIMEOUT = 0.1
+        settings.AI_MODEL_FAILURE_THRESHOLD = 10
+        model_server.delay = 0.3
+        jwt_authenticate()
+        job_id = submit_job().data["id"]
+
+        run_worker()
+        run_worker()
+        job = PredictionJob.objects.get(pk=job_id)
+        model_server.delay = 0
+        PredictionJob.objects.update(not_before=timezone.now())
+        run_worker()
+
+        assert job.status == PredictionJob.PENDING
+        assert job.not_before > timezone.now() + timedelta(seconds=50)
+        assert len(model_server.calls) == 2
+        assert PredictionJob.objects.get(pk=job_id).status == PredictionJob.DONE
+
+    def test_if_retry_delay_doubles_up_to_maximum(self, settings):
+        settings.PREDICTION_JOB_RETRY_DELAY = 10
+        settings.PREDICTION_JOB_MAX_RETRY_DELAY = 60
+
+        assert [retry_delay(attempts) for attempts in range(1, 6)] == [
+            10,
+            20,
+            40,
+            60,
+            60,
+        ]
+
+    def test_if_job_belongs_to_another_user_returns_404(
+        self, api_client, submit_job, model_server, jwt_authenticate
+    ):
+        jwt_authenticate()
+        job_id = submit_job().data["id"]
+        jwt_authenticate(username="other", email="other@gmail.com")
+
+        response = api_client.get(f"/api/predict/jobs/{job_id}/")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def tone(frequency, rate=16000, seconds=0.5):
+    time = np.arange(int(rate * seconds)) / rate
+    return encode_wav(0.5 * np.sin(2 * np.pi * frequency * time), rate)
+
+
+@pytest.fixture
+def local_model(tmp_path, settings):
+    model = NumpyModel.random(labels=3)
+    path = tmp_path / "predictor.npz"
+    model.save(path)
+    settings.PREDICTION_BACKEND = "anees.inference.LocalModelBackend"
+    settings.LOCAL_MODEL_PATH = str(path)
+    return model
+
+
+@pytest.mark.django_db
+class TestLocalPredictor:
+    def test_if_local_backend_predicts_returns_200(
+        self, predict, local_model, jwt_authenticate
+    ):
+        jwt_authenticate()
+        content = tone(440)
+
+        response = predict(label="label1", content=content)
+
+        probabilities = local_model.predict_batch(
+            local_model.features.extract(content)[None]
+        )[0]
+        passed = "passed" if probabilities.argmax() == 1 else "failed"
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "result": [passed, round(float(probabilities[1]) * 100)]
+        }
+
+    def test_if_unknown_label_fails(self, predict, local_model, jwt_authenticate):
+        jwt_authenticate()
+
+        response = predict(label="dog", content=tone(440))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"result": ["failed", 0]}
+
+    def test_if_recording_is_not_wav_returns_400(
+        self, predict, local_model, jwt_authenticate
+    ):
+        jwt_authenticate()
+
+        response = predict(label="label1", content=b"recording")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_model_file_keeps_its_features(self, tmp_path):
+        path = tmp_path / "predictor.npz"
+        features = LogMelFeatures(sample_rate=8000, n_mels=20, frames=50)
+        NumpyModel.random(labels=2, features=features).save(path)
+
+        loaded = NumpyModel.load(path)
+
+        assert loaded.features.metadata() == features.metadata()
+        assert loaded.input_size == 1000
+
+    def test_if_concurrent_predictions_share_batches(self, local_model, settings):
+        settings.PREDICTION_MAX_BATCH_SIZE = 4
+        settings.PREDICTION_MAX_BATCH_WAIT = 0.5
+        backend = get_predictor()
+        recordings = [tone(200 + 100 * i) for i in range(8)]
+
+        async def predict_many():
+            return await asyncio.gather(
+                *(backend.predict("label0", "f", content) for content in recordings)
+            )
+
+        results = asyncio.run(predict_many())
+
+        assert len(results) == 8
+        assert backend.batcher.batches == 2
+        features = local_model.features.extract(recordings[3])
+        single = local_model.predict_batch(features[None])[0]
+        assert results[3][1]["result"][1] == round(float(single[0]) * 100)
+
+    def test_if_model_input_does_not_match_features_raises(self, tmp_path, settings):
+        path = tmp_path / "predictor.npz"
+        NumpyModel.random(input_size=10).save(path)
+        settings.PREDICTION_BACKEND = "anees.inference.LocalModelBackend"
+        settings.LOCAL_MODEL_PATH = str(path)
+
+        with pytest.raises(ImproperlyConfigured):
+            get_predictor()
+
+    def test_if_model_path_is_missing_raises(self, settings):
+        settings.PREDICTION_BACKEND = "anees.inference.LocalModelBackend"
+        settings.LOCAL_MODEL_PATH = None
+
+        with pytest.raises(ImproperlyConfigured):
+            get_predictor()
+
+    def test_if_benchmark_reports_every_batch_size(self):
+        out = StringIO()
+        call_command(
+            "benchmark_predictor", "--items", "64", "--batch-sizes", "1,16", stdout=out
+        )
+        assert out.getvalue().count("batch size") == 4
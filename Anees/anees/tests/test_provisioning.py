@@ -0,0 +1,125 @@
+from io import StringIO
+import pytest
+from django.core.management import call_command
+from anees.models import ChildLevel, Level, LevelProvisioningJob
+from anees.provisioning import provision_next_batch, run_provisioning_job
+
+
+@pytest.mark.django_db
+class TestLevelProvisioning:
+    def test_if_new_level_is_given_to_every_child_in_bulk(
+        self,
+        create_user,
+        django_assert_max_num_queries,
+        django_capture_on_commit_callbacks,
+    ):
+        for index in range(5):
+            create_user(username=f"child{index}", email=f"child{index}@gmail.com")
+
+        with django_assert_max_num_queries(10):
+            with django_capture_on_commit_callbacks(execute=True):
+                Level.objects.create(level_num=1)
+
+        assert ChildLevel.objects.filter(level__level_num=1).count() == 5
+        assert ChildLevel.objects.filter(receptive_score=100).count() == 5
+
+    def test_if_level_is_given_with_games_saved_after_it(
+        self, create_user, create_level
+    ):
+        create_user(username="child1", email="child1@gmail.com")
+
+        create_level(1)
+
+        child_level = ChildLevel.objects.get()
+        assert not child_level.receptive_complete
+        assert child_level.receptive_score == 0
+
+    def test_if_only_children_who_cleared_previous_level_get_it(
+        self, create_user, create_level
+    ):
+        create_level(1)
+        create_user(username="child1", email="child1@gmail.com")
+        create_user(username="child2", email="child2@gmail.com")
+        ChildLevel.objects.filter(child__user__username="child1").update(
+            receptive_complete=True, expressive_complete=True, social_complete=True
+        )
+
+        create_level(2)
+
+        children = ChildLevel.objects.filter(level__level_num=2)
+        assert [c.child.user.username for c in children] == ["child1"]
+
+    def test_if_large_level_is_provisioned_by_resumable_job(
+        self, create_user, create_level, settings
+    ):
+        settings.LEVEL_PROVISIONING_SYNC_LIMIT = 2
+        settings.LEVEL_PROVISIONING_BATCH_SIZE = 2
+        users = [
+            create_user(username=f"child{index}", email=f"child{index}@gmail.com")
+            for index in range(5)
+        ]
+
+        create_level(1)
+        job = LevelProvisioningJob.objects.get()
+        assert job.total == 5
+        assert not ChildLevel.objects.exists()
+
+        job.last_child_id = users[1].pk
+        job.processed = 2
+        job.save()
+        call_command("run_provisioning_jobs", "--once", stdout=StringIO())
+
+        job.refresh_from_db()
+        assert job.status == LevelProvisioningJob.DONE
+        assert job.processed == 5
+        assert ChildLevel.objects.count() == 3
+
+    def test_if_finished_job_is_not_run_again(
+        self, create_user, create_level, settings
+    ):
+        settings.LEVEL_PROVISIONING_SYNC_LIMIT = 0
+        create_user()
+        level = create_level(1)
+        job = LevelProvisioningJob.objects.get(level=level)
+        run_provisioning_job(job.pk)
+        ChildLevel.objects.all().delete()
+
+        run_provisioning_job(job.pk)
+        assert not ChildLevel.objects.exists()
+
+    def test_if_second_runner_does_not_count_children_twice(
+        self, create_user, create_level, settings
+    ):
+        settings.LEVEL_PROVISIONING_SYNC_LIMIT = 0
+        settings.LEVEL_PROVISIONING_BATCH_SIZE = 2
+        for index in range(3):
+            create_user(username=f"child{index}", email=f"child{index}@gmail.com")
+        job = LevelProvisioningJob.objects.get(level=create_level(1))
+        provision_next_batch(job.pk, 2)
+
+        # a runner that picked the job up before the first batch was stored
+        run_provisioning_job(job.pk)
+        call_command("run_provisioning_jobs", "--once", stdout=StringIO())
+
+        job.refresh_from_db()
+        assert job.processed == 3
+        assert ChildLevel.objects.count() == 3
+
+    def test_if_failed_job_is_retried_only_when_asked(
+        self, create_user, create_level, settings
+    ):
+        settings.LEVEL_PROVISIONING_SYNC_LIMIT = 0
+        create_user()
+        job = LevelProvisioningJob.objects.get(level=create_level(1))
+        job.status = LevelProvisioningJob.FAILED
+        job.save()
+
+        call_command("run_provisioning_jobs", "--once", stdout=StringIO())
+        assert not ChildLevel.objects.exists()
+
+        call_command(
+            "run_provisioning_jobs", "--once", "--retry-failed", stdout=StringIO()
+        )
+        job.refresh_from_db()
+        assert job.status == LevelProvisioningJob.DONE
+        assert ChildLevel.objects.count() == 1
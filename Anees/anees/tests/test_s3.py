@@ -0,0 +1,220 @@
+import base64
+import hashlib
+from io import StringIO
+from urllib.parse import parse_qs, urlsplit
+import pytest
+import requests
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from rest_framework import status
+from anees.models import Child
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+pytest.importorskip("storages")
+
+PICTURE = open("anees/tests/test.png", "rb").read()
+
+
+@pytest.fixture(autouse=True)
+def bucket(settings, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_s3():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="media")
+        settings.AWS_STORAGE_BUCKET_NAME = "media"
+        settings.AWS_S3_REGION_NAME = "us-east-1"
+        settings.AWS_S3_SIGNATURE_VERSION = "s3v4"
+        settings.AWS_DEFAULT_ACL = None
+        settings.DEFAULT_FILE_STORAGE = "anees.s3.ContentAddressedS3Storage"
+        yield
+
+
+def upload(target, content, filename="picture.png", content_type="image/png"):
+    return {
+        "target": target,
+        "digest": hashlib.sha256(content).hexdigest(),
+        "filename": filename,
+        "content_type": content_type,
+    }
+
+
+@pytest.mark.django_db
+class TestS3Storage:
+    def test_if_blob_is_stored_once_in_bucket(self):
+        first = default_storage.save("level/social/a.mp4", ContentFile(b"video"))
+        second = default_storage.save("level/social/b.mp4", ContentFile(b"video"))
+
+        assert first == second
+        assert first == f"level/social/{hashlib.sha256(b'video').hexdigest()}.mp4"
+        objects = boto3.client("s3", region_name="us-east-1").list_objects(
+            Bucket="media"
+        )
+        assert [entry["Key"] for entry in objects["Contents"]] == [first]
+
+    def test_if_dedupe_command_moves_bucket_copies_to_blobs(self, create_user):
+        child = Child.objects.get(user=create_user())
+        boto3.client("s3", region_name="us-east-1").put_object(
+            Bucket="media", Key="profile/images/me.png", Body=PICTURE
+        )
+        Child.objects.filter(pk=child.pk).update(picture="profile/images/me.png")
+
+        out = StringIO()
+        call_command("dedupe_media", stdout=out)
+
+        digest = hashlib.sha256(PICTURE).hexdigest()
+        child.refresh_from_db()
+        assert child.picture.name == f"profile/images/{digest}.png"
+        assert not default_storage.exists("profile/images/me.png")
+
+    def test_if_media_view_redirects_to_presigned_url(
+        self, api_client, authenticate, create_level
+    ):
+        create_level(1)
+        authenticate()
+        child = Child.objects.get()
+        child.picture = ContentFile(b"picture", name="me.png")
+        child.save()
+
+        response = api_client.get(child.picture.url)
+
+        assert child.picture.url.startswith("/api/media/profile/images/")
+        assert response.status_code == status.HTTP_302_FOUND
+        assert "X-Amz-Signature=" in response["Location"]
+        assert child.picture.name in response["Location"]
+        assert requests.get(response["Location"]).content == b"picture"
+
+
+@pytest.mark.django_db
+class TestDirectUpload:
+    def test_if_app_uploads_picture_without_django(self, api_client, authenticate):
+        authenticate()
+        content = PICTURE
+
+        response = api_client.post(
+            "/api/media/uploads/", upload("child.picture", content)
+        )
+        assert response.status_code == status.HTTP_200_OK
+        put = response.data["upload"]
+        stored = requests.put(put["url"], data=content, headers=put["headers"])
+        assert stored.status_code == status.HTTP_200_OK
+
+        response = api_client.put(
+            "/api/children/me/", {"picture_name": response.data["name"]}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        child = Child.objects.get()
+        assert child.picture.name.endswith(f"{hashlib.sha256(content).hexdigest()}.png")
+        assert child.picture.read() == content
+
+    def test_if_checksum_is_part_of_the_signature(self, api_client, authenticate):
+        authenticate()
+
+        put = api_client.post(
+            "/api/media/uploads/", upload("child.picture", b"announced")
+        ).data["upload"]
+
+        # the bucket refuses a body that doesn't match a signed checksum
+        signed_headers = parse_qs(urlsplit(put["url"]).query)["X-Amz-SignedHeaders"]
+        assert "x-amz-checksum-sha256" in signed_headers[0].split(";")
+        assert (
+            put["headers"]["x-amz-checksum-sha256"]
+            == base64.b64encode(hashlib.sha256(b"announced").digest()).decode()
+        )
+
+    def test_if_stored_blob_needs_no_upload(self, api_client, authenticate):
+        authenticate()
+        name = default_storage.save("profile/images/a.png", ContentFile(b"same"))
+
+        response = api_client.post(
+            "/api/media/uploads/", upload("child.picture", b"same")
+        )
+
+        assert response.data == {"name": name, "upload": None}
+
+    def test_if_unknown_name_is_rejected(self, api_client, authenticate):
+        authenticate()
+        digest = hashlib.sha256(b"missing").hexdigest()
+
+        response = api_client.put(
+            "/api/children/me/", {"picture_name": f"profile/images/{digest}.png"}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_game_media_needs_staff(self, api_client, authenticate):
+        authenticate()
+
+        response = api_client.post(
+            "/api/media/uploads/",
+            upload("social.video", b"clip", "clip.mp4", "video/mp4"),
+        )
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_staff_gets_video_upload(self, api_client, authenticate):
+        authenticate(is_staff=True)
+
+        response = api_client.post(
+            "/api/media/uploads/",
+            upload("social.video", b"clip", "clip.mp4", "video/mp4"),
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["name"].startswith("level/social/")
+        assert response.data["upload"]["method"] == "PUT"
+
+    def test_if_filesystem_storage_returns_400(
+        self, api_client, authenticate, settings
+    ):
+        settings.DEFAULT_FILE_STORAGE = "anees.storage.ContentAddressedStorage"
+        authenticate()
+
+        response = api_client.post("/api/media/uploads/", upload("child.picture", b"x"))
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_picture_of_another_type_returns_400(self, api_client, authenticate):
+        authenticate()
+
+        response = api_client.post(
+            "/api/media/uploads/",
+            upload("child.picture", b"<script>", "x.html", "text/html"),
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_signed_content_type_follows_extension(self, api_client, authenticate):
+        authenticate()
+
+        response = api_client.post(
+            "/api/media/uploads/",
+            upload("child.picture", b"picture", "me.JPG", "image/png"),
+        )
+
+        assert response.data["name"].endswith(".jpg")
+        assert response.data["upload"]["headers"]["Content-Type"] == "image/jpeg"
+
+    def test_if_uploaded_picture_is_not_an_image_returns_400(
+        self, api_client, authenticate
+    ):
+        authenticate()
+        name = default_storage.save(
+            "profile/images/x.png", ContentFile(b"<script>alert(1)</script>")
+        )
+
+        response = api_client.put("/api/children/me/", {"picture_name": name})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Child.objects.get().picture
+
+    def test_if_other_media_is_downloaded_as_attachment(self, api_client, authenticate):
+        authenticate(is_staff=True)
+        name = default_storage.save("level/social/x.html", ContentFile(b"<script>"))
+
+        response = api_client.get(f"/api/media/{name}")
+
+        query = parse_qs(urlsplit(response["Location"]).query)
+        assert query["response-content-disposition"] == ["attachment"]
@@ -0,0 +1,54 @@
+import os
+import pytest
+from rest_framework import status
+
+
+@pytest.fixture
+def index(settings, tmp_path):
+    path = tmp_path / "index.html"
+    path.write_bytes(b"<html>first</html>")
+    settings.SPA_INDEX = str(path)
+    return path
+
+
+@pytest.mark.django_db
+class TestSpaShell:
+    def test_if_page_returns_index(self, api_client, index):
+        response = api_client.get("/levels/3")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == b"<html>first</html>"
+        assert response["Content-Type"] == "text/html; charset=utf-8"
+        assert response["Cache-Control"] == "public, no-cache"
+        assert response["X-Frame-Options"] == "DENY"
+        assert "Set-Cookie" not in response
+        assert "Cookie" not in response.get("Vary", "")
+
+    def test_if_unchanged_index_returns_304(self, api_client, index):
+        etag = api_client.get("/").headers["ETag"]
+
+        response = api_client.get("/profile/", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_new_build_is_picked_up(self, api_client, index):
+        etag = api_client.get("/").headers["ETag"]
+        index.write_bytes(b"<html>second</html>")
+        mtime = os.stat(index).st_mtime + 10
+        os.utime(index, (mtime, mtime))
+
+        response = api_client.get("/", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == b"<html>second</html>"
+
+    def test_if_api_is_not_answered_by_shell(self, api_client, index):
+        response = api_client.get("/api/levels/")
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_other_methods_reach_catch_all_view(self, api_client, index):
+        response = api_client.post("/levels/3")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == b"<html>first</html>"
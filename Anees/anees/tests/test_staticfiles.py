@@ -0,0 +1,40 @@
+import gzip
+import brotli
+import pytest
+from django.core.management import call_command
+
+BUNDLE = b"function greet(name) { return 'hello ' + name; }\n" * 100
+
+
+@pytest.fixture
+def static_dirs(settings, tmp_path):
+    source = tmp_path / "build"
+    (source / "js").mkdir(parents=True)
+    (source / "js" / "main.js").write_bytes(BUNDLE)
+    (source / "js" / "tiny.js").write_bytes(b"let a = 1;")
+    (source / "logo.png").write_bytes(b"\x89PNG" + bytes(4096))
+    settings.STATICFILES_DIRS = [str(source)]
+    settings.STATICFILES_FINDERS = [
+        "django.contrib.staticfiles.finders.FileSystemFinder"
+    ]
+    settings.STATIC_ROOT = str(tmp_path / "staticfiles")
+    return tmp_path / "staticfiles"
+
+
+class TestCompressedManifestStaticFilesStorage:
+    def test_if_bundles_are_precompressed(self, static_dirs):
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+        hashed = next((static_dirs / "js").glob("main.*.js"))
+        for path in [static_dirs / "js" / "main.js", hashed]:
+            gz = path.with_name(path.name + ".gz")
+            br = path.with_name(path.name + ".br")
+            assert gzip.decompress(gz.read_bytes()) == BUNDLE
+            assert brotli.decompress(br.read_bytes()) == BUNDLE
+
+    def test_if_small_and_binary_files_are_left_alone(self, static_dirs):
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+        assert not list(static_dirs.glob("js/tiny*.gz"))
+        assert not list(static_dirs.glob("logo*.gz"))
+        assert (static_dirs / "staticfiles.json").exists()
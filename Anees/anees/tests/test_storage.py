@@ -0,0 +1,83 @@
+import hashlib
+from io import StringIO
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import call_command
+from anees.models import Expressive, Level, ReceptiveImage
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_VARIANT_SIZES = {"thumbnail": 160}
+
+
+@pytest.mark.django_db
+class TestContentAddressedStorage:
+    def test_if_upload_is_stored_under_its_digest(self):
+        name = default_storage.save("level/expressive/apple.PNG", ContentFile(b"apple"))
+
+        digest = hashlib.sha256(b"apple").hexdigest()
+        assert name == f"level/expressive/{digest}.png"
+        assert default_storage.open(name).read() == b"apple"
+
+    def test_if_identical_uploads_share_one_blob(self, create_level):
+        create_level(1)
+
+        names = set(ReceptiveImage.objects.values_list("img", flat=True))
+
+        assert len(names) == 1
+        assert ReceptiveImage.objects.count() == 4
+
+    def test_if_referenced_blob_is_kept_on_delete(self, create_level):
+        create_level(1)
+        image, other = ReceptiveImage.objects.all()[:2]
+
+        image.delete()
+        image.img.delete(save=False)
+
+        assert default_storage.exists(other.img.name)
+
+    def test_if_unreferenced_blob_is_deleted(self, create_level):
+        level = create_level(1)
+        name = Expressive.objects.get(level=level).img.name
+
+        Level.objects.all().delete()
+        default_storage.delete(name)
+
+        assert not default_storage.exists(name)
+
+    def test_if_derived_file_is_overwritten(self):
+        name = default_storage.save("level/expressive/apple.png", ContentFile(b"1"))
+        derived = name.replace(".png", ".thumbnail.webp")
+
+        default_storage.save(derived, ContentFile(b"old"))
+        saved = default_storage.save(derived, ContentFile(b"new"))
+
+        assert saved == derived
+        assert default_storage.open(derived).read() == b"new"
+
+
+@pytest.mark.django_db
+class TestDedupeMedia:
+    def test_if_command_moves_copies_to_one_blob(self, create_level, settings):
+        level = create_level(1)
+        plain = FileSystemStorage(location=settings.MEDIA_ROOT)
+        picture = open("anees/tests/test.png", "rb").read()
+        for number, image in enumerate(ReceptiveImage.objects.all()):
+            name = plain.save(
+                f"level/receptive/apple{number}.png", ContentFile(picture)
+            )
+            ReceptiveImage.objects.filter(pk=image.pk).update(img=name)
+        version = Level.objects.get(pk=level.pk).content_version
+
+        out = StringIO()
+        call_command("dedupe_media", stdout=out)
+
+        names = set(ReceptiveImage.objects.values_list("img", flat=True))
+        digest = hashlib.sha256(picture).hexdigest()
+        assert names == {f"level/receptive/{digest}.png"}
+        assert not plain.exists("level/receptive/apple0.png")
+        assert Level.objects.get(pk=level.pk).content_version > version
+        assert "Receptive Games Images: 4 files moved to 1 blobs" in out.getvalue()
@@ -0,0 +1,275 @@
+import base64
+import hashlib
+import os
+from datetime import timedelta
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from rest_framework import status
+from anees.chunked_uploads import part_path
+from anees.models import ChunkedUpload, Social
+
+VIDEO = bytes(range(256)) * 40
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.CHUNKED_UPLOAD_ROOT = str(tmp_path / "chunked")
+    settings.CHUNKED_UPLOAD_CHUNK_SIZE = 4096
+
+
+@pytest.fixture
+def start_upload(api_client):
+    def _start_upload(
+        target="social.video",
+        size=len(VIDEO),
+        filename="clip.MP4",
+        content_type="video/mp4",
+    ):
+        return api_client.post(
+            "/api/uploads/",
+            {
+                "target": target,
+                "filename": filename,
+                "content_type": content_type,
+                "size": size,
+            },
+        )
+
+    return _start_upload
+
+
+@pytest.fixture
+def send_chunk(api_client):
+    def _send_chunk(upload, offset, chunk, **headers):
+        return api_client.patch(
+            upload["url"],
+            chunk,
+            content_type="application/offset+octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+            **headers,
+        )
+
+    return _send_chunk
+
+
+def send_file(send_chunk, upload, content, start=0, chunk_size=4096):
+    for offset in range(start, len(content), chunk_size):
+        response = send_chunk(upload, offset, content[offset : offset + chunk_size])
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestChunkedUpload:
+    def test_if_upload_is_started_returns_201(self, authenticate, start_upload):
+        authenticate(is_staff=True)
+
+        response = start_upload()
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["offset"] == 0
+        assert response.data["status"] == "Uploading"
+        assert os.path.exists(part_path(ChunkedUpload.objects.get()))
+
+    def test_if_video_target_needs_staff(self, authenticate, start_upload):
+        authenticate()
+
+        response = start_upload()
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_too_large_file_returns_400(self, authenticate, start_upload, settings):
+        settings.CHUNKED_UPLOAD_MAX_SIZE = 1024
+        authenticate(is_staff=True)
+
+        response = start_upload(size=1025)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_chunks_are_stored_as_one_blob(
+        self, api_client, authenticate, start_upload, send_chunk
+    ):
+        authenticate(is_staff=True)
+        upload = start_upload().data
+
+        send_file(send_chunk, upload, VIDEO)
+        response = api_client.post(
+            f"{upload['url']}complete/",
+            {"digest": hashlib.sha256(VIDEO).hexdigest()},
+        )
+
+        digest = hashlib.sha256(VIDEO).hexdigest()
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["status"] == "Complete"
+        assert response.data["name"] == f"level/social/{digest}.mp4"
+        assert default_storage.open(response.data["name"]).read() == VIDEO
+        assert not os.path.exists(part_path(ChunkedUpload.objects.get()))
+
+    def test_if_wrong_offset_returns_409(self, authenticate, start_upload, send_chunk):
+        authenticate(is_staff=True)
+        upload = start_upload().data
+        send_chunk(upload, 0, VIDEO[:4096])
+
+        response = send_chunk(upload, 0, VIDEO[:4096])
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.data["offset"] == 4096
+
+    def test_if_interrupted_upload_resumes_from_offset(
+        self, api_client, authenticate, start_upload, send_chunk
+    ):
+        authenticate(is_staff=True)
+        upload = start_upload().data
+        send_chunk(upload, 0, VIDEO[:4096])
+        # the connection dropped halfway through the second chunk
+        send_chunk(upload, 4096, VIDEO[4096:6000])
+
+        offset = api_client.get(upload["url"]).data["offset"]
+        send_file(send_chunk, upload, VIDEO, start=offset)
+        response = api_client.post(f"{upload['url']}complete/")
+
+        assert offset == 6000
+        assert default_storage.open(response.data["name"]).read() == VIDEO
+
+    def test_if_chunk_checksum_mismatch_returns_400(
+        self, api_client, authenticate, start_upload, send_chunk
+    ):
+        authenticate(is_staff=True)
+        upload = start_upload().data
+        checksum = base64.b64encode(hashlib.sha256(b"other").digest()).decode()
+
+        response = send_chunk(
+            upload, 0, VIDEO[:4096], HTTP_UPLOAD_CHECKSUM=f"sha256 {checksum}"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(upload["url"]).data["offset"] == 0
+        assert os.path.getsize(part_path(ChunkedUpload.objects.get())) == 0
+
+    def test_if_too_large_chunk_returns_413(
+        self, authenticate, start_upload, send_chunk
+    ):
+        authenticate(is_staff=True)
+        upload = start_upload().data
+
+        response = send_chunk(upload, 0, VIDEO[:4097])
+
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+    def test_if_incomplete_upload_cannot_complete(
+        self, api_client, authenticate, start_upload, send_chunk
+    ):
+        authenticate(is_staff=True)
+        upload = start_upload().data
+        send_chunk(upload, 0, VIDEO[:4096])
+
+        response = api_client.post(f"{upload['url']}complete/")
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+    def test_if_file_digest_mismatch_discards_upload(
+        self, api_client, authenticate, start_upload, send_chunk
+    ):
+        authenticate(is_staff=True)
+        upload = start_upload().data
+        send_file(send_chunk, upload, VIDEO)
+
+        response = api_client.post(
+            f"{upload['url']}complete/",
+            {"digest": hashlib.sha256(b"other").hexdigest()},
+        )
+
+        digest = hashlib.sha256(VIDEO).hexdigest()
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not ChunkedUpload.objects.exists()
+        assert not default_storage.exists(f"level/social/{digest}.mp4")
+
+    def test_if_other_user_upload_returns_404(
+        self, api_client, authenticate, start_upload
+    ):
+        authenticate(is_staff=True)
+        upload = start_upload().data
+        authenticate(username="other", email="other@gmail.com")
+
+        response = api_client.get(upload["url"])
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_admin_form_takes_uploaded_name(
+        self, authenticate, start_upload, send_chunk, api_client
+    ):
+        authenticate(is_staff=True)
+        upload = start_upload().data
+        send_file(send_chunk, upload, VIDEO)
+        name = api_client.post(f"{upload['url']}complete/").data["name"]
+        field = Social._meta.get_field("video").formfield()
+
+        assert field.clean(name) == name
+        with pytest.raises(ValidationError):
+            field.clean(f"level/social/{hashlib.sha256(b'x').hexdigest()}.mp4")
+
+    def test_if_stale_uploads_are_cleaned(self, authenticate, start_upload):
+        authenticate(is_staff=True)
+        start_upload()
+        upload = ChunkedUpload.objects.get()
+        ChunkedUpload.objects.update(updated_at=upload.updated_at - timedelta(days=2))
+
+        call_command("clean_chunked_uploads")
+
+        assert not ChunkedUpload.objects.exists()
+        assert not os.path.exists(part_path(upload))
+
+    def test_if_child_uploads_picture_returns_200(
+        self, api_client, authenticate, start_upload, send_chunk
+    ):
+        authenticate()
+        picture = open("anees/tests/test.png", "rb").read()
+        upload = start_upload("child.picture", len(picture), "me.png", "image/png").data
+
+        send_file(send_chunk, upload, picture)
+        response = api_client.post(f"{upload['url']}complete/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["name"].startswith("profile/images/")
+        assert response.data["name"].endswith(".png")
+
+    @pytest.mark.parametrize(
+        "filename, content_type",
+        [("x.html", "text/html"), ("x.png", "text/html"), ("x.svg", "image/svg+xml")],
+    )
+    def test_if_picture_is_not_an_image_type_returns_400(
+        self, authenticate, start_upload, filename, content_type
+    ):
+        authenticate()
+
+        response = start_upload("child.picture", 100, filename, content_type)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not ChunkedUpload.objects.exists()
+
+    def test_if_too_large_picture_returns_400(
+        self, authenticate, start_upload, settings
+    ):
+        settings.IMAGE_UPLOAD_MAX_SIZE = 1024
+        authenticate()
+
+        response = start_upload("child.picture", 1025, "me.png", "image/png")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_picture_content_is_not_an_image_discards_upload(
+        self, api_client, authenticate, start_upload, send_chunk
+    ):
+        authenticate()
+        content = b"<script>alert(1)</script>"
+        upload = start_upload("child.picture", len(content), "x.png", "image/png").data
+        send_file(send_chunk, upload, content)
+
+        response = api_client.post(f"{upload['url']}complete/")
+
+        digest = hashlib.sha256(content).hexdigest()
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not ChunkedUpload.objects.exists()
+        assert not default_storage.exists(f"profile/images/{digest}.png")
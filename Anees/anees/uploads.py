@@ -0,0 +1,70 @@
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from rest_framework import status
+
+
+class PredictionUploadHandler(TemporaryFileUploadHandler):
+    """
+    Spool uploads for the prediction model straight to a temporary file, so
+    memory use does not grow with the file, and hash them on the way.
+
+    Requests that are too large or carry a file of a type the model does not
+    take are stopped as soon as that is known, before the rest of the body is
+    read. The reason ends up in ``error`` as a ``(status, message)`` pair and
+    the digests of stored files in ``digests``, keyed by field name.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.PREDICTION_MAX_UPLOAD_SIZE
+        self.content_types = settings.PREDICTION_CONTENT_TYPES
+        self.digests = {}
+        self.error = None
+        self._hash = None
+        self._size = 0
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        if content_length > self.max_size + 64 * 1024:
+            self.reject(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        return None
+
+    def new_file(self, field_name, file_name, content_type, *args, **kwargs):
+        if self.error:
+            raise StopUpload(connection_reset=True)
+        if not content_type.startswith(tuple(self.content_types)):
+            self.reject(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+            raise StopUpload(connection_reset=True)
+        super().new_file(field_name, file_name, content_type, *args, **kwargs)
+        self._hash = hashlib.sha256()
+        self._size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self._size += len(raw_data)
+        if self._size > self.max_size:
+            self.reject(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            raise StopUpload(connection_reset=True)
+        self._hash.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        self.digests[self.field_name] = self._hash.hexdigest()
+        return super().file_complete(file_size)
+
+    def reject(self, status_code):
+        if status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE:
+            message = "The File Is Too Large"
+        else:
+            message = "This File Type Is Not Supported"
+        self.error = (status_code, message)
+
+
+def use_prediction_uploads(request):
+    """Make the request store its uploads through a PredictionUploadHandler."""
+    handler = PredictionUploadHandler(request)
+    # works for Django and DRF requests alike, as long as the body is unread
+    request.upload_handlers[:] = [handler]
+    return handler
@@ -17,7 +17,14 @@ urlpatterns = [
     path("children/me/", views.ChildDetailApiView.as_view(), name="child-detail"),
     path("children/me/words/", views.ChildWordsApiView.as_view(), name="child-words"),
     path("levels/", views.LevelListApiView.as_view(), name="levels-list"),
+    path("levels/sync/", views.ScoreSyncApiView.as_view(), name="levels-sync"),
+    path("levels/packs/", views.LevelPackListApiView.as_view(), name="level-packs"),
     path("levels/<int:pk>/", views.LevelDetailApiView.as_view(), name="level-detail"),
+    path(
+        "levels/<int:pk>/bundle/",
+        views.LevelBundleApiView.as_view(),
+        name="level-bundle",
+    ),
     path(
         "levels/<int:pk>/receptive/", views.ReceptiveApiView.as_view(), name="receptive"
     ),
@@ -27,5 +34,33 @@ urlpatterns = [
         name="expressive",
     ),
     path("levels/<int:pk>/social/", views.SocialApiView.as_view(), name="social"),
+    path("media/uploads/", views.DirectUploadApiView.as_view(), name="media-uploads"),
+    path("media/<path:path>", views.ProtectedMediaApiView.as_view(), name="media"),
+    path("uploads/", views.ChunkedUploadListApiView.as_view(), name="chunked-uploads"),
+    path(
+        "uploads/<uuid:pk>/",
+        views.ChunkedUploadDetailApiView.as_view(),
+        name="chunked-upload",
+    ),
+    path(
+        "uploads/<uuid:pk>/complete/",
+        views.ChunkedUploadCompleteApiView.as_view(),
+        name="chunked-upload-complete",
+    ),
     path("predict/", views.AIModelApiView.as_view(), name="predict"),
+    path(
+        "predict/stats/",
+        views.PredictionCacheStatsApiView.as_view(),
+        name="predict-stats",
+    ),
+    path(
+        "predict/jobs/",
+        views.PredictionJobListApiView.as_view(),
+        name="prediction-jobs",
+    ),
+    path(
+        "predict/jobs/<uuid:pk>/",
+        views.PredictionJobDetailApiView.as_view(),
+        name="prediction-job",
+    ),
 ]
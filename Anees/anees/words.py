@@ -0,0 +1,72 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import ChildLevel
+
+WORDS_CACHE_TIMEOUT = 60 * 60 * 24
+WORDS_GENERATION_KEY = "anees:words:generation"
+
+
+def _words_cache_key(child_id, generation):
+    return f"anees:words:{generation}:{child_id}"
+
+
+def _generation():
+    return cache.get_or_set(WORDS_GENERATION_KEY, time.time_ns, timeout=None)
+
+
+def load_learned_words(child_id):
+    """
+    Collect the answers of every receptive and expressive game the child has
+    completed, in level order, with a single query joining both games.
+    """
+    rows = (
+        ChildLevel.objects.filter(child_id=child_id)
+        .filter(Q(receptive_complete=True) | Q(expressive_complete=True))
+        .order_by("level__level_num")
+        .values_list(
+            "receptive_complete",
+            "level__receptive__answer",
+            "expressive_complete",
+            "level__expressive__answer",
+        )
+    )
+    receptive_words = []
+    expressive_words = []
+    for receptive_complete, receptive, expressive_complete, expressive in rows:
+        if receptive_complete and receptive:
+            receptive_words.append(receptive)
+        if expressive_complete and expressive:
+            expressive_words.append(expressive)
+    return {"receptive": receptive_words, "expressive": expressive_words}
+
+
+def get_learned_words(child_id):
+    key = _words_cache_key(child_id, _generation())
+    words = cache.get(key)
+    if words is None:
+        words = load_learned_words(child_id)
+        cache.set(key, words, WORDS_CACHE_TIMEOUT)
+    return words
+
+
+def invalidate_learned_words(*child_ids):
+    def delete():
+        generation = _generation()
+        cache.delete_many([_words_cache_key(pk, generation) for pk in child_ids])
+
+    # Deleting again on commit stops a concurrent read from caching the
+    # words as they were before this transaction.
+    delete()
+    transaction.on_commit(delete)
+
+
+def invalidate_all_learned_words():
+    """Used when a game's answer changes, since every child may have learned it."""
+    try:
+        cache.incr(WORDS_GENERATION_KEY)
+    except ValueError:
+        cache.set(WORDS_GENERATION_KEY, time.time_ns(), timeout=None)
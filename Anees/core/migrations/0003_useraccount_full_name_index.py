@@ -0,0 +1,17 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_useraccount_username'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='useraccount',
+            index=models.Index(fields=['first_name', 'last_name', 'id'], name='user_full_name_idx'),
+        ),
+    ]
@@ -91,6 +91,13 @@ class UserAccount(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = ["first_name", "last_name", "date_of_birth", "gender", "email"]
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["first_name", "last_name", "id"], name="user_full_name_idx"
+            )
+        ]
+
     def __str__(self):
         full_name = self.get_full_name()
 
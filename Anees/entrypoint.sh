@@ -13,7 +13,16 @@ fi
 
 
 python manage.py migrate
-python manage.py collectstatic --no-input --clear
+python manage.py warm_content_cache
+
+# the static files were collected when the image was built, only copy them
+# when this image brings a different manifest; files of older builds stay
+# for clients still holding an older page
+if ! cmp -s collectedstatic/staticfiles.json staticfiles/staticfiles.json
+then
+    echo "Syncing static files..."
+    cp -R collectedstatic/. staticfiles/
+fi
 
 
 exec "$@"
\ No newline at end of file
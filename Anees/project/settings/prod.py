@@ -20,6 +20,44 @@ DATABASES = {
         "PORT": os.environ.get("SQL_PORT"),
     }
 }
+if os.environ.get("REDIS_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("REDIS_URL"),
+    }
+    CACHES["prediction_stats"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("REDIS_URL"),
+        "KEY_PREFIX": "prediction_stats",
+        "TIMEOUT": None,
+    }
+# predictions go to a Redis of their own, capped with maxmemory and
+# allkeys-lru (see docker-compose.yml), so they can never push out the keys
+# of the other caches. Without one, each worker keeps the bounded locmem
+# cache of common.py
+if os.environ.get("PREDICTION_REDIS_URL"):
+    CACHES["predictions"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("PREDICTION_REDIS_URL"),
+        "TIMEOUT": 60 * 60 * 24,
+    }
+
+MEDIA_ACCEL_REDIRECT = int(os.environ.get("MEDIA_ACCEL_REDIRECT", 1))
+
+if os.environ.get("AWS_STORAGE_BUCKET_NAME"):
+    # media in an S3 compatible bucket instead of the shared media volume,
+    # AWS_S3_ENDPOINT_URL points at e.g. MinIO
+    DEFAULT_FILE_STORAGE = "anees.s3.ContentAddressedS3Storage"
+    AWS_STORAGE_BUCKET_NAME = os.environ.get("AWS_STORAGE_BUCKET_NAME")
+    AWS_S3_ENDPOINT_URL = os.environ.get("AWS_S3_ENDPOINT_URL")
+    AWS_S3_REGION_NAME = os.environ.get("AWS_S3_REGION_NAME")
+    AWS_S3_ADDRESSING_STYLE = os.environ.get("AWS_S3_ADDRESSING_STYLE")
+    AWS_ACCESS_KEY_ID = os.environ.get("AWS_ACCESS_KEY_ID")
+    AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY")
+    AWS_S3_SIGNATURE_VERSION = "s3v4"
+    AWS_DEFAULT_ACL = None
+    AWS_QUERYSTRING_EXPIRE = int(os.environ.get("AWS_QUERYSTRING_EXPIRE", 3600))
+
 # email settings
 EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND")
 EMAIL_HOST = os.environ.get("EMAIL_HOST")
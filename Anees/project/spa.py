@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import get_resolver
+from django.urls.resolvers import RoutePattern
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.http import http_date
+
+
+class SpaShell:
+    """
+    The built React ``index.html``, read once per process and read again
+    only when the file's mtime changes, e.g. after a new build was copied in.
+    It has no template tags, so it is sent as it is.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = None
+
+    def load(self):
+        path = settings.SPA_INDEX
+        mtime = os.stat(path).st_mtime
+        loaded = self.loaded
+        if loaded is None or loaded[0] != path or loaded[1] != mtime:
+            with self.lock:
+                with open(path, "rb") as index:
+                    content = index.read()
+                etag = f'"{hashlib.sha1(content).hexdigest()}"'
+                loaded = self.loaded = (path, mtime, content, etag)
+        return loaded
+
+    def response(self, request):
+        _, mtime, content, etag = self.load()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(mtime)
+        )
+        if response is None:
+            response = HttpResponse(content, content_type="text/html; charset=utf-8")
+        response.headers["ETag"] = etag
+        response.headers["Last-Modified"] = http_date(int(mtime))
+        # the same for everyone, but a new build has to show up right away
+        response.headers["Cache-Control"] = "public, no-cache"
+        response.headers["X-Frame-Options"] = settings.X_FRAME_OPTIONS
+        return response
+
+
+shell = SpaShell()
+
+
+def spa_shell(request):
+    """Catch-all view answering every path the React router handles."""
+    return shell.response(request)
+
+
+def routed_prefixes():
+    """The path prefixes of the root urlconf that aren't the SPA."""
+    prefixes = []
+    for pattern in get_resolver().url_patterns:
+        if getattr(pattern, "callback", None) is spa_shell:
+            continue
+        if not isinstance(pattern.pattern, RoutePattern):
+            return None
+        prefixes.append("/" + str(pattern.pattern).split("<")[0])
+    return tuple(prefixes)
+
+
+@sync_and_async_middleware
+def spa_shell_middleware(get_response):
+    """
+    Answer page loads of the SPA before the session, CSRF and auth
+    middleware run, none of which the shell uses. Only GET and HEAD requests
+    outside the other routes of the root urlconf are answered here, the rest
+    goes through the whole stack. With regex routes in the root urlconf,
+    every request does.
+    """
+    prefixes = routed_prefixes()
+
+    def shell_response(request):
+        if (
+            prefixes is not None
+            and request.method in ("GET", "HEAD")
+            and not request.path_info.startswith(prefixes)
+        ):
+            return shell.response(request)
+        return None
+
+    if asyncio.iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            response = shell_response(request)
+            if response is None:
+                response = await get_response(request)
+            return response
+
+    else:
+
+        def middleware(request):
+            response = shell_response(request)
+            if response is None:
+                response = get_response(request)
+            return response
+
+    return middleware
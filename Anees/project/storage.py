@@ -0,0 +1,54 @@
+import gzip
+
+import brotli
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.utils.functional import cached_property
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage that also writes a ``.gz`` and a ``.br`` copy of every
+    text asset it collects, hashed or not, so the web server can send them
+    as they are instead of compressing on each request. A copy that isn't
+    smaller than the asset is not kept.
+    """
+
+    @cached_property
+    def compressed_extensions(self):
+        return tuple(settings.STATIC_COMPRESS_EXTENSIONS)
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if not isinstance(processed, Exception):
+                names.update([name, hashed_name])
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+
+        for name in sorted(names):
+            if name and self.should_compress(name):
+                self.compress(name)
+
+    def should_compress(self, name):
+        return (
+            name.endswith(self.compressed_extensions)
+            and self.size(name) >= settings.STATIC_COMPRESS_MIN_SIZE
+        )
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, "rb") as asset:
+            content = asset.read()
+        # mtime=0 keeps the .gz identical across builds of the same asset
+        for extension, compressed in [
+            (".gz", gzip.compress(content, compresslevel=9, mtime=0)),
+            (".br", brotli.compress(content, mode=brotli.MODE_TEXT)),
+        ]:
+            if len(compressed) >= len(content):
+                continue
+            with open(path + extension, "wb") as output:
+                output.write(compressed)